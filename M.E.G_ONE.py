@@ -3,15 +3,43 @@ import re
 import sys
 import io
 import csv
+import math
+import gzip
+import json
+import shutil
+import hashlib
+import time
+import ctypes
+import pickle
+import tempfile
 import urllib.request
+import numpy as np
 import pandas as pd
+from pandas.io.parsers import TextParser
 import pdfplumber
 import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+try:
+    import xlsxwriter  # opcional: saída Excel em streaming mais rápida
+except ImportError:
+    xlsxwriter = None
+try:
+    import pyarrow  # opcional: saída em Parquet
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+try:
+    import python_calamine  # opcional: leitura de Excel bem mais rápida
+except ImportError:
+    python_calamine = None
 from datetime import datetime, date
-from collections import defaultdict
+from collections import Counter, defaultdict
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from PIL import Image, ImageTk
 
@@ -19,22 +47,189 @@ from PIL import Image, ImageTk
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
-# Função para ler o Excel de contatos
-def carregar_contatos_excel(caminho_excel):
-    contatos_dict = {}
-    wb = openpyxl.load_workbook(caminho_excel)
-    sheet = wb.active
-    for row in sheet.iter_rows(min_row=2, values_only=True):
-        if len(row) >= 4:
-            codigo, nome, nome_contato, nome_grupo = row[:4]
-            # Converter código para inteiro e depois para string para remover .0
-            codigo_limpo = str(int(float(codigo))) if codigo is not None else ""
-            contatos_dict[codigo_limpo] = {
-                'empresa': nome,
-                'contato': nome_contato,
-                'grupo': nome_grupo
+# Engine central do pd.read_excel: calamine quando o python-calamine está instalado (pandas 2.2+),
+# senão a engine padrão do pandas (openpyxl para .xlsx)
+_VERSAO_PANDAS = tuple(int(parte) for parte in re.findall(r'\d+', pd.__version__)[:2])
+ENGINE_LEITURA_EXCEL = 'calamine' if python_calamine is not None and _VERSAO_PANDAS >= (2, 2) else None
+
+
+def texto_em_branco(valor):
+    """True para textos só com espaços, tabs ou quebras de linha (o calamine já os lê como célula vazia)"""
+    return isinstance(valor, str) and not valor.strip(' \t\r\n')
+
+
+def _brancos_como_vazios(df, inferir_tipos=True):
+    """
+    Células de texto em branco viram NaN, como na leitura com calamine. Uma coluna que só era
+    texto por causa delas passa pela mesma conversão do parser do pd.read_excel (números, datas).
+    """
+    for posicao, tipo in enumerate(df.dtypes):
+        if tipo != object:
+            continue
+        coluna = df.iloc[:, posicao]
+        em_branco = coluna.map(texto_em_branco).astype(bool)
+        if not em_branco.any():
+            continue
+        coluna = coluna.mask(em_branco)
+        if inferir_tipos:
+            try:
+                coluna = pd.to_numeric(coluna)
+            except (ValueError, TypeError):
+                coluna = coluna.infer_objects()
+        df.isetitem(posicao, coluna)
+    return df
+
+
+def ler_excel(caminho, colunas=None, **kwargs):
+    """
+    pd.read_excel com a engine central (ENGINE_LEITURA_EXCEL), aceita os mesmos argumentos.
+    Arquivos em rede são lidos da cópia local (arquivo_local).
+    `colunas`: posições (base 0, em ordem crescente) a ler; o DataFrame volta só com elas.
+    Se a planilha tiver menos colunas que o pedido, volta só com as que existem, para que
+    a validação do próprio modelo gere o erro de sempre.
+    O calamine lê células de texto só com espaços como vazias; nas outras engines elas também
+    viram NaN, para que o resultado não dependa da engine instalada.
+    """
+    caminho = arquivo_local(caminho)
+    if ENGINE_LEITURA_EXCEL and 'engine' not in kwargs:
+        kwargs['engine'] = ENGINE_LEITURA_EXCEL
+    if colunas is None:
+        df = pd.read_excel(caminho, **kwargs)
+    else:
+        try:
+            df = pd.read_excel(caminho, usecols=list(colunas), **kwargs)
+        except pd.errors.ParserError as e:
+            if 'out-of-bounds' not in str(e):
+                raise
+            df = pd.read_excel(caminho, **kwargs)
+            df = df.iloc[:, [col for col in colunas if col < df.shape[1]]]
+    if kwargs.get('engine') != 'calamine':
+        df = _brancos_como_vazios(df, inferir_tipos='dtype' not in kwargs and 'converters' not in kwargs)
+    return df
+
+
+# Colunas (posições, base 0, em ordem crescente) que cada modelo lê das suas planilhas de entrada.
+# No DataFrame lido, a posição i corresponde a COLUNAS_ENTRADA[modelo][i].
+COLUNAS_ENTRADA = {
+    "ComuniCertificado": [0, 1, 2, 4, 7],  # código, empresa, CNPJ, vencimento, situação
+    "DomBot_GMS": [0, 1, 2],               # Nº, empresa, tarefa
+    "DomBot_Admiss": [0, 3],               # código/empresa, nome do funcionário
+    "DomBot_Admiss_contrato": [0, 4],      # código do funcionário, "CÓDIGO - EMPRESA"
+    "ALL": [0, 1],                         # código ou nome, nome (só no modo streaming)
+    "ALL_info": [0],                       # código
+}
+
+
+# Modo streaming (planilhas de origem muito grandes): a origem é lida em blocos de linhas e cada
+# bloco vai direto para a saída, com memória constante independente do tamanho do arquivo.
+# Automático para arquivos acima de LIMITE_STREAMING_BYTES.
+TAMANHO_BLOCO_STREAMING = 20000
+LIMITE_STREAMING_BYTES = 20 * 1024 * 1024
+
+
+def tamanho_bloco_streaming(caminho, tamanho_bloco=None):
+    """
+    Decide o modo de leitura: None = automático (streaming só para arquivos grandes),
+    0 = sempre em memória, N = streaming em blocos de N linhas. Retorna 0 ou o tamanho do bloco.
+    """
+    if tamanho_bloco is None:
+        try:
+            grande = os.path.getsize(caminho) > LIMITE_STREAMING_BYTES
+        except OSError:
+            grande = False
+        return TAMANHO_BLOCO_STREAMING if grande else 0
+    return max(int(tamanho_bloco), 0)
+
+
+def estimar_linhas_excel(caminho):
+    """Número de linhas de dados da primeira aba, pela dimensão gravada no arquivo (None se não houver)"""
+    wb = openpyxl.load_workbook(arquivo_local(caminho), read_only=True)
+    try:
+        total = wb.worksheets[0].max_row
+    finally:
+        wb.close()
+    return total - 1 if total else None
+
+
+def _bloco_para_dataframe(linhas, inicio):
+    """Converte as linhas de um bloco com o parser do pd.read_excel (vazios e 'NA' viram NaN)"""
+    # skip_blank_lines=False: linha só com colunas vazias (ex.: código em branco) continua no bloco
+    df = TextParser(linhas, header=None, dtype=object, skip_blank_lines=False).read()
+    df.index = pd.RangeIndex(inicio, inicio + len(df))
+    return df
+
+
+def ler_excel_em_blocos(caminho, colunas, tamanho_bloco=TAMANHO_BLOCO_STREAMING):
+    """
+    Leitura preguiçosa da primeira aba (openpyxl read_only), pulando o cabeçalho.
+    Gera DataFrames de até `tamanho_bloco` linhas só com `colunas` (posições, base 0), com
+    índice contínuo entre os blocos. Números inteiros viram int e vazios (e textos em branco)
+    viram NaN, como no ler_excel, mas sem inferência de tipo por coluna: células de texto continuam texto.
+    Linhas vazias no fim da planilha são ignoradas, também como no pd.read_excel.
+    """
+    wb = openpyxl.load_workbook(arquivo_local(caminho), read_only=True, data_only=True)
+    try:
+        linhas = wb.worksheets[0].iter_rows(values_only=True)
+        if next(linhas, None) is None:
+            return
+        bloco = []
+        inicio = 0
+        vazias_pendentes = 0
+        for row in linhas:
+            if all(valor is None or texto_em_branco(valor) for valor in row):
+                vazias_pendentes += 1
+                continue
+            # Linha vazia no meio da planilha continua existindo (com NaN)
+            bloco.extend([''] * len(colunas) for _ in range(vazias_pendentes))
+            vazias_pendentes = 0
+            valores = []
+            for col in colunas:
+                valor = row[col] if col < len(row) else None
+                if valor is None or texto_em_branco(valor):
+                    valor = ''
+                elif isinstance(valor, float) and valor.is_integer():
+                    valor = int(valor)
+                valores.append(valor)
+            bloco.append(valores)
+            if len(bloco) >= tamanho_bloco:
+                yield _bloco_para_dataframe(bloco, inicio)
+                inicio += len(bloco)
+                bloco = []
+        if bloco:
+            yield _bloco_para_dataframe(bloco, inicio)
+    finally:
+        wb.close()
+
+
+def iterar_contatos_excel(caminho_excel, codigos=None, tamanho_bloco=TAMANHO_BLOCO_STREAMING):
+    """
+    Lê o Excel de contatos em streaming (ler_excel_em_blocos: openpyxl read_only, só valores) e
+    gera (código limpo, {'empresa', 'contato', 'grupo'}) linha a linha, com vazios como None.
+    Se `codigos` for informado, as linhas dos demais códigos são descartadas ainda no bloco, antes
+    de montar os registros. Contatos sem código ficam de fora (como em contatos_por_codigo).
+    O arquivo é fechado ao terminar a leitura ou quando o gerador é descartado.
+    """
+    for bloco in ler_excel_em_blocos(caminho_excel, [0, 1, 2, 3], tamanho_bloco):
+        codigos_bloco = limpar_codigo_serie(bloco[0])
+        manter = codigos_bloco != ''
+        if codigos is not None:
+            manter &= codigos_bloco.isin(codigos)
+        if not manter.any():
+            continue
+        registros = bloco.loc[manter, [1, 2, 3]].astype(object)
+        registros = registros.where(registros.notna(), None)
+        for codigo, (empresa, contato, grupo) in zip(codigos_bloco[manter], registros.itertuples(index=False, name=None)):
+            yield codigo, {
+                'empresa': empresa,
+                'contato': contato,
+                'grupo': grupo
             }
-    return contatos_dict
+
+
+def carregar_contatos_excel(caminho_excel, codigos=None):
+    """Dicionário código → empresa/contato/grupo (a última linha de cada código prevalece)"""
+    return dict(iterar_contatos_excel(caminho_excel, codigos))
+
 
 # Função auxiliar para limpar e padronizar códigos
 def limpar_codigo(codigo):
@@ -53,8 +248,825 @@ def limpar_codigo(codigo):
     except:
         return str(codigo).strip()
 
+
+# Versões vetorizadas (Series) das funções de limpeza: mesmo resultado, elemento a elemento,
+# das funções escalares; tipos fora do caminho rápido usam a função escalar via .map
+def _texto_serie(valores):
+    """str(valor) de cada elemento, como Series object (mantém as regex do Python nas operações .str)"""
+    if pd.api.types.is_object_dtype(valores) or pd.api.types.is_string_dtype(valores) or \
+            valores.dtype == np.float64 or (pd.api.types.is_integer_dtype(valores) and not pd.api.types.is_bool_dtype(valores)):
+        return valores.astype(str).astype(object)
+    return valores.map(str).astype(object)
+
+
+def _caminho_rapido(valores):
+    """True se o dtype tem caminho vetorizado; os demais (datas, bool, float32...) usam a função escalar"""
+    return valores.dtype == np.float64 or pd.api.types.is_object_dtype(valores) or \
+        pd.api.types.is_string_dtype(valores) or \
+        (pd.api.types.is_integer_dtype(valores) and not pd.api.types.is_bool_dtype(valores))
+
+
+def limpar_codigo_serie(serie):
+    """Versão vetorizada de limpar_codigo"""
+    resultado = pd.Series('', index=serie.index, dtype=object)
+    preenchidos = serie.notna()
+    valores = serie[preenchidos]
+    if valores.empty:
+        return resultado
+    if not _caminho_rapido(valores):
+        resultado[preenchidos] = valores.map(limpar_codigo)
+        return resultado
+
+    # Floats (coluna float ou floats soltos numa coluna object): inteiros viram str(int(x))
+    if valores.dtype == np.float64:
+        eh_float = pd.Series(True, index=valores.index)
+    elif pd.api.types.is_object_dtype(valores):
+        eh_float = valores.map(lambda v: isinstance(v, float))
+    else:
+        eh_float = pd.Series(False, index=valores.index)
+    if eh_float.any():
+        floats = valores[eh_float].astype(np.float64)
+        inteiros = np.isfinite(floats) & (floats == np.trunc(floats)) & (floats.abs() < 2 ** 63)
+        resultado[inteiros[inteiros].index] = floats[inteiros].astype('int64').astype(str).astype(object)
+        # Floats enormes, não inteiros ou inf/-inf: regra escalar (raros em códigos)
+        outros = floats[~inteiros]
+        resultado[outros.index] = valores[outros.index].map(limpar_codigo)
+
+    # Demais valores: str(x).strip() e remove um '.0' final
+    textos = _texto_serie(valores[~eh_float]).str.strip()
+    textos = textos.where(~textos.str.endswith('.0'), textos.str[:-2])
+    resultado[textos.index] = textos
+    return resultado
+
+# Saída em streaming: as linhas são gravadas à medida que chegam, sem montar o workbook
+# inteiro em memória. Mesmo layout do DataFrame.to_excel (aba "Sheet1", cabeçalho em negrito).
+def valor_celula(valor):
+    """Converte valores do pandas/numpy em tipos nativos para os writers (NaN/NaT viram célula vazia)"""
+    if valor is None or valor is pd.NaT or valor is pd.NA:
+        return None
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and not math.isfinite(valor):
+        # Igual ao to_excel: NaN vazio, infinitos como texto (inf_rep)
+        return None if math.isnan(valor) else ('inf' if valor > 0 else '-inf')
+    if isinstance(valor, pd.Timestamp):
+        return valor.to_pydatetime()
+    return valor
+
+
+class SaidaTabular:
+    """
+    Base dos writers de saída. Uso:
+        with abrir_saida(caminho, colunas) as saida:
+            saida.escrever(linha)  # sequência na ordem das colunas ou dict
+    """
+
+    def __init__(self, caminho, colunas, limite_linhas=0):
+        self.caminho = caminho
+        self.colunas = list(colunas)
+        self.linhas = 0
+        # Gravação em arquivo temporário local: `caminho` é o temporário e `destino` o arquivo final
+        self.destino = None
+        self.log_callback = None
+        self._inicio = time.perf_counter()
+        # Limite de linhas por aba (só .xlsx): ao atingir, continua em uma nova aba com o cabeçalho
+        self.limite_linhas = limite_linhas
+        self.abas = 1
+        self._linhas_aba = 0
+
+    def escrever(self, linha):
+        if isinstance(linha, dict):
+            linha = [linha.get(coluna) for coluna in self.colunas]
+        if self.limite_linhas and self._linhas_aba >= self.limite_linhas:
+            self.abas += 1
+            self._nova_aba(f"Sheet{self.abas}")
+            self._linhas_aba = 0
+        self._gravar([valor_celula(valor) for valor in linha])
+        self.linhas += 1
+        self._linhas_aba += 1
+
+    def escrever_linhas(self, linhas):
+        for linha in linhas:
+            self.escrever(linha)
+
+    def escrever_dataframe(self, df):
+        self.escrever_linhas(df.itertuples(index=False, name=None))
+
+    def fechar(self):
+        self._finalizar()
+        if self.destino:
+            publicar_arquivo(self.caminho, self.destino, time.perf_counter() - self._inicio, self.log_callback)
+
+    def descartar(self):
+        """Fecha sem publicar: o temporário é apagado e o destino fica como estava"""
+        try:
+            self._finalizar()
+        finally:
+            if os.path.exists(self.caminho):
+                os.remove(self.caminho)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo_erro, erro, traceback):
+        if tipo_erro is not None and self.destino:
+            # Com erro o temporário é descartado e o destino fica como estava (nunca um arquivo pela metade)
+            self.descartar()
+        else:
+            self.fechar()
+        return False
+
+
+class SaidaXlsxWriter(SaidaTabular):
+    """xlsxwriter em modo constant_memory: cada linha vai para o disco assim que a próxima começa"""
+    motor = 'xlsxwriter'
+
+    def __init__(self, caminho, colunas, limite_linhas=0):
+        super().__init__(caminho, colunas, limite_linhas)
+        self._wb = xlsxwriter.Workbook(caminho, {'constant_memory': True})
+        self._formato_data = self._wb.add_format({'num_format': 'YYYY-MM-DD'})
+        self._formato_data_hora = self._wb.add_format({'num_format': 'YYYY-MM-DD HH:MM:SS'})
+        self._formato_cabecalho = self._wb.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+        self._nova_aba('Sheet1')
+
+    def _nova_aba(self, nome):
+        self._ws = self._wb.add_worksheet(nome)
+        for col, nome_coluna in enumerate(self.colunas):
+            self._ws.write(0, col, valor_celula(nome_coluna), self._formato_cabecalho)
+        self._linha_atual = 1
+
+    def _gravar(self, valores):
+        ws = self._ws
+        linha = self._linha_atual
+        for col, valor in enumerate(valores):
+            if valor is None or valor == '':
+                continue  # texto vazio fica como célula vazia, igual ao openpyxl
+            if isinstance(valor, bool):
+                ws.write_boolean(linha, col, valor)
+            elif isinstance(valor, (int, float)):
+                ws.write_number(linha, col, valor)
+            elif isinstance(valor, datetime):
+                ws.write_datetime(linha, col, valor, self._formato_data_hora)
+            elif isinstance(valor, date):
+                ws.write_datetime(linha, col, valor, self._formato_data)
+            else:
+                ws.write_string(linha, col, str(valor))
+        self._linha_atual += 1
+
+    def _finalizar(self):
+        self._wb.close()
+
+
+class SaidaOpenpyxl(SaidaTabular):
+    """openpyxl em modo write_only (fallback quando o xlsxwriter não está instalado)"""
+    motor = 'openpyxl'
+
+    def __init__(self, caminho, colunas, limite_linhas=0):
+        super().__init__(caminho, colunas, limite_linhas)
+        self._wb = openpyxl.Workbook(write_only=True)
+        self._nova_aba('Sheet1')
+
+    def _nova_aba(self, nome):
+        self._ws = self._wb.create_sheet(nome)
+        borda = Side(style='thin')
+        cabecalho = []
+        for nome in self.colunas:
+            celula = WriteOnlyCell(self._ws, value=valor_celula(nome))
+            celula.font = Font(bold=True)
+            celula.border = Border(left=borda, right=borda, top=borda, bottom=borda)
+            celula.alignment = Alignment(horizontal='center', vertical='top')
+            cabecalho.append(celula)
+        self._ws.append(cabecalho)
+
+    def _celula_data(self, valor, formato):
+        celula = WriteOnlyCell(self._ws, value=valor)
+        celula.number_format = formato
+        return celula
+
+    def _gravar(self, valores):
+        for col, valor in enumerate(valores):
+            if isinstance(valor, datetime):
+                valores[col] = self._celula_data(valor, 'YYYY-MM-DD HH:MM:SS')
+            elif isinstance(valor, date):
+                valores[col] = self._celula_data(valor, 'YYYY-MM-DD')
+        self._ws.append(valores)
+
+    def _finalizar(self):
+        self._wb.save(self.caminho)
+        self._wb.close()
+
+
+class SaidaCsv(SaidaTabular):
+    """CSV em UTF-8 com BOM (abre direto no Excel); vazios viram campo vazio"""
+    motor = 'csv'
+
+    def __init__(self, caminho, colunas, anexar=False):
+        super().__init__(caminho, colunas)
+        # anexar=True: continua um arquivo já existente (sem BOM nem cabeçalho)
+        self._arquivo = open(caminho, 'a' if anexar else 'w', encoding='utf-8' if anexar else 'utf-8-sig', newline='')
+        self._csv = csv.writer(self._arquivo)
+        if not anexar:
+            self._csv.writerow(self.colunas)
+
+    def _gravar(self, valores):
+        self._csv.writerow(valores)
+
+    def _finalizar(self):
+        self._arquivo.close()
+
+
+class SaidaJsonl(SaidaTabular):
+    """Um objeto JSON por linha, com as colunas como chaves; vazios viram null, datas viram texto"""
+    motor = 'jsonl'
+
+    def __init__(self, caminho, colunas, anexar=False):
+        super().__init__(caminho, colunas)
+        self._chaves = [str(coluna) for coluna in self.colunas]
+        self._arquivo = open(caminho, 'a' if anexar else 'w', encoding='utf-8')
+
+    def _gravar(self, valores):
+        registro = {chave: (None if valor == '' else valor) for chave, valor in zip(self._chaves, valores)}
+        self._arquivo.write(json.dumps(registro, ensure_ascii=False, default=str) + '\n')
+
+    def _finalizar(self):
+        self._arquivo.close()
+
+
+def _array_parquet(valores):
+    """Coluna Parquet com um tipo só: int, float, bool, data ou texto (colunas mistas viram texto)"""
+    tipos = {type(valor) for valor in valores if valor is not None}
+    if tipos == {bool}:
+        return pyarrow.array(valores, type=pyarrow.bool_())
+    if tipos == {int}:
+        try:
+            return pyarrow.array(valores, type=pyarrow.int64())
+        except OverflowError:
+            pass
+    elif tipos and tipos <= {int, float}:
+        return pyarrow.array(valores, type=pyarrow.float64())
+    elif tipos == {datetime}:
+        return pyarrow.array(valores, type=pyarrow.timestamp('us'))
+    elif tipos == {date}:
+        return pyarrow.array(valores, type=pyarrow.date32())
+    return pyarrow.array([None if valor is None else str(valor) for valor in valores], type=pyarrow.string())
+
+
+class SaidaParquet(SaidaTabular):
+    """
+    Parquet (pyarrow). O tipo de cada coluna só é conhecido no fim, então as linhas ficam
+    em memória (em listas por coluna) até o fechamento.
+    """
+    motor = 'parquet'
+
+    def __init__(self, caminho, colunas):
+        if pyarrow is None:
+            raise ValueError("A saída em Parquet requer o pacote pyarrow (pip install pyarrow).")
+        super().__init__(caminho, colunas)
+        self._valores = [[] for _ in self.colunas]
+
+    def _gravar(self, valores):
+        for coluna, valor in zip(self._valores, valores):
+            coluna.append(None if valor == '' else valor)
+
+    def escrever_dataframe(self, df):
+        # Coluna a coluna: tipos simples não precisam passar por valor_celula valor a valor
+        for coluna, (_, serie) in zip(self._valores, df.items()):
+            if serie.dtype.kind in 'iub':
+                coluna.extend(serie.tolist())
+            elif serie.dtype.kind == 'f' and not np.isinf(serie.to_numpy()).any():
+                coluna.extend(serie.astype(object).where(serie.notna(), None).tolist())
+            elif pd.api.types.infer_dtype(serie, skipna=False) == 'string':
+                coluna.extend([valor or None for valor in serie.tolist()])
+            else:
+                coluna.extend(None if valor == '' else valor for valor in map(valor_celula, serie.tolist()))
+        self.linhas += len(df)
+
+    def _finalizar(self):
+        tabela = pyarrow.Table.from_arrays([_array_parquet(valores) for valores in self._valores],
+                                           names=[str(coluna) for coluna in self.colunas])
+        pyarrow.parquet.write_table(tabela, self.caminho)
+
+
+class SaidaEmArquivos(SaidaTabular):
+    """
+    Divide a saída em arquivos numerados (saida.xlsx, saida_2.xlsx, ...) de até `limite_linhas`
+    linhas cada, todos com o cabeçalho. Cada arquivo é fechado antes do próximo ser aberto, mas
+    as partes só são publicadas no destino juntas, no fechamento (ver publicar_arquivos); com
+    erro todas são descartadas. Partes numeradas de uma gravação anterior maior são removidas.
+    """
+    motor = 'arquivos'
+
+    def __init__(self, caminho, colunas, limite_linhas, abrir_arquivo):
+        super().__init__(caminho, colunas)
+        self.limite_por_arquivo = limite_linhas
+        self._abrir_arquivo = abrir_arquivo
+        self.arquivos = [caminho]
+        # Partes já fechadas, ainda no temporário local: (writer, tempo de gravação)
+        self._prontas = []
+        self._atual = abrir_arquivo(caminho)
+
+    def _fechar_atual(self):
+        self._atual._finalizar()
+        self._prontas.append((self._atual, time.perf_counter() - self._atual._inicio))
+
+    def _caminho_parte(self, numero):
+        base, extensao = os.path.splitext(self.caminho)
+        return f"{base}_{numero}{extensao}"
+
+    def _arquivo_com_espaco(self):
+        if self._atual.linhas >= self.limite_por_arquivo:
+            self._fechar_atual()
+            caminho = self._caminho_parte(len(self.arquivos) + 1)
+            self.arquivos.append(caminho)
+            self._atual = self._abrir_arquivo(caminho)
+        return self._atual
+
+    def escrever(self, linha):
+        self._arquivo_com_espaco().escrever(linha)
+        self.linhas += 1
+
+    def escrever_dataframe(self, df):
+        inicio = 0
+        while inicio < len(df):
+            atual = self._arquivo_com_espaco()
+            fim = inicio + self.limite_por_arquivo - atual.linhas
+            atual.escrever_dataframe(df.iloc[inicio:fim])
+            self.linhas += len(df.iloc[inicio:fim])
+            inicio = fim
+
+    def fechar(self):
+        self._fechar_atual()
+        publicar_arquivos([(parte.caminho, parte.destino, tempo) for parte, tempo in self._prontas],
+                          self._atual.log_callback)
+        # Partes numeradas que sobraram de uma gravação anterior maior (saida_3.xlsx quando agora só há 2)
+        numero = len(self.arquivos) + 1
+        while os.path.exists(self._caminho_parte(numero)):
+            os.remove(self._caminho_parte(numero))
+            numero += 1
+
+    def __exit__(self, tipo_erro, erro, traceback):
+        if tipo_erro is None:
+            self.fechar()
+        else:
+            try:
+                self._atual.descartar()
+            finally:
+                for parte, _ in self._prontas:
+                    if os.path.exists(parte.caminho):
+                        os.remove(parte.caminho)
+        return False
+
+
+# Formatos de saída pela extensão do arquivo (qualquer outra extensão gera .xlsx)
+FORMATOS_SAIDA = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+}
+
+# Máximo de linhas de dados por aba do Excel (1.048.576 linhas menos o cabeçalho). Saídas maiores
+# continuam em novas abas (Sheet2, Sheet3, ...) ou em arquivos numerados, conforme DIVISAO_SAIDA.
+LIMITE_LINHAS_EXCEL = 1048575
+LIMITE_LINHAS_SAIDA = LIMITE_LINHAS_EXCEL
+DIVISAO_SAIDA = 'abas'  # 'abas' ou 'arquivos'
+
+
+def formato_saida(caminho, formato=None):
+    """Formato de saída: o informado em `formato` ou o da extensão do arquivo (padrão xlsx)"""
+    if formato:
+        formato = formato.lower().lstrip('.')
+        if formato not in ('xlsx', 'csv', 'parquet', 'jsonl'):
+            raise ValueError(f"Formato de saída não suportado: {formato}")
+        return formato
+    return FORMATOS_SAIDA.get(os.path.splitext(str(caminho))[1].lower(), 'xlsx')
+
+
+def arquivo_temporario_local(caminho):
+    """Arquivo temporário na pasta de cache local, com a mesma extensão de `caminho`"""
+    descritor, temporario = tempfile.mkstemp(suffix=os.path.splitext(str(caminho))[1], prefix='saida_',
+                                            dir=pasta_cache('temporarios'))
+    os.close(descritor)
+    return temporario
+
+
+def publicar_arquivos(arquivos, log_callback=None):
+    """
+    Move os arquivos temporários locais para os destinos: `arquivos` é uma lista de
+    (temporario, destino, tempo_gravacao). Cada temporário vai primeiro para um .parcial ao lado
+    do seu destino (no mesmo disco é só um rename; em outro disco ou compartilhamento de rede (Z:)
+    é uma cópia sequencial) e só depois de todos transferidos os .parcial são renomeados, para que
+    ninguém leia um arquivo incompleto nem uma mistura de partes novas e antigas. Se alguma
+    transferência falhar, nenhum destino é alterado.
+    """
+    transferidos = []
+    try:
+        for temporario, destino, tempo_gravacao in arquivos:
+            inicio = time.perf_counter()
+            tamanho = os.path.getsize(temporario)
+            parcial = f"{destino}.parcial"
+            try:
+                os.replace(temporario, parcial)
+            except OSError:
+                shutil.copyfile(temporario, parcial)
+            transferidos.append(parcial)
+            if log_callback:
+                gravacao = f"gravado localmente em {tempo_gravacao:.2f}s, " if tempo_gravacao is not None else ""
+                log_callback(f"{os.path.basename(destino)}: {gravacao}transferido para o destino em "
+                             f"{time.perf_counter() - inicio:.2f}s ({tamanho / (1024 * 1024):.1f} MB)")
+        for (_, destino, _), parcial in zip(arquivos, transferidos):
+            os.replace(parcial, destino)
+    finally:
+        for temporario, destino, _ in arquivos:
+            for resto in (temporario, f"{destino}.parcial"):
+                if os.path.exists(resto):
+                    os.remove(resto)
+
+
+def publicar_arquivo(temporario, destino, tempo_gravacao=None, log_callback=None):
+    """Move um arquivo temporário local para o destino (ver publicar_arquivos)"""
+    publicar_arquivos([(temporario, destino, tempo_gravacao)], log_callback)
+
+
+def _abrir_arquivo_saida(caminho, colunas, formato, limite_linhas=0, log_callback=None):
+    temporario = arquivo_temporario_local(caminho)
+    if formato == 'csv':
+        saida = SaidaCsv(temporario, colunas)
+    elif formato == 'jsonl':
+        saida = SaidaJsonl(temporario, colunas)
+    elif formato == 'parquet':
+        saida = SaidaParquet(temporario, colunas)
+    elif xlsxwriter is not None:
+        saida = SaidaXlsxWriter(temporario, colunas, limite_linhas)
+    else:
+        saida = SaidaOpenpyxl(temporario, colunas, limite_linhas)
+    saida.destino = caminho
+    saida.log_callback = log_callback
+    return saida
+
+
+def iterar_arquivo_saida(caminho, formato):
+    """
+    Lê de volta, linha a linha, um arquivo gravado pela saída: gera primeiro o cabeçalho e depois
+    as linhas, com vazios como None. No .xlsx lê todas as abas (Sheet1, Sheet2, ...) e mantém
+    datas sem hora como date.
+    """
+    if formato == 'csv':
+        with open(caminho, encoding='utf-8-sig', newline='') as f:
+            leitor = csv.reader(f)
+            yield next(leitor, [])
+            for linha in leitor:
+                yield [valor if valor != '' else None for valor in linha]
+        return
+    if formato == 'jsonl':
+        with open(caminho, encoding='utf-8') as f:
+            registros = (json.loads(linha) for linha in f if linha.strip())
+            primeiro = next(registros, None)
+            cabecalho = list(primeiro) if primeiro is not None else []
+            yield cabecalho
+            if primeiro is not None:
+                yield [primeiro.get(chave) for chave in cabecalho]
+            for registro in registros:
+                yield [registro.get(chave) for chave in cabecalho]
+        return
+    if formato == 'parquet':
+        if pyarrow is None:
+            raise ValueError("A saída em Parquet requer o pacote pyarrow (pip install pyarrow).")
+        arquivo = pyarrow.parquet.ParquetFile(caminho)
+        yield list(arquivo.schema_arrow.names)
+        for lote in arquivo.iter_batches():
+            for registro in lote.to_pylist():
+                yield list(registro.values())
+        return
+
+    wb = openpyxl.load_workbook(caminho, read_only=True)
+    try:
+        cabecalho = None
+        for ws in wb.worksheets:
+            celulas = ws.iter_rows()
+            cabecalho_aba = [celula.value for celula in next(celulas, ())]
+            if cabecalho is None:
+                cabecalho = cabecalho_aba
+                yield cabecalho
+            for linha in celulas:
+                valores = []
+                for celula in linha:
+                    valor = celula.value
+                    if isinstance(valor, datetime) and celula.number_format == 'YYYY-MM-DD':
+                        valor = valor.date()
+                    valores.append(valor)
+                if any(valor is not None for valor in valores):
+                    yield valores
+        if cabecalho is None:
+            yield []
+    finally:
+        wb.close()
+
+
+def ler_arquivo_saida(caminho, formato):
+    """Lê de volta um arquivo gravado pela saída: retorna (cabeçalho, linhas) (ver iterar_arquivo_saida)"""
+    linhas = iterar_arquivo_saida(caminho, formato)
+    cabecalho = next(linhas)
+    return cabecalho, list(linhas)
+
+
+class SaidaUpsert(SaidaTabular):
+    """
+    Atualiza uma saída já existente em vez de recriá-la: as linhas recebidas substituem, no mesmo
+    lugar, as linhas do arquivo com a mesma chave (todas as do grupo) e chaves novas vão para o fim.
+    O restante do arquivo é mantido como estava.
+
+    Custo: na abertura o arquivo existente é lido inteiro, mas só as chaves ficam em memória; as
+    linhas recebidas ficam todas em memória até o fechamento (no modo streaming a memória deixa de
+    ser constante). No fechamento, se só vieram chaves novas e a saída é um único .csv/.jsonl, as
+    linhas são anexadas no fim do arquivo (se falhar, o arquivo volta ao tamanho original). Nos
+    demais casos o arquivo inteiro é regravado (relido linha a linha), com tempo proporcional ao
+    tamanho total da saída e não ao da mudança; com erro durante o processamento ele não é tocado.
+    """
+    motor = 'upsert'
+
+    def __init__(self, caminho, colunas, chaves, partes, abrir_arquivo, formato, log_callback=None, anexar_arquivo=None):
+        super().__init__(caminho, colunas)
+        faltando = [chave for chave in chaves if chave not in self.colunas]
+        if faltando:
+            raise ValueError(f"Colunas de chave do upsert não encontradas na saída: {faltando}")
+        self.chaves = chaves
+        self._posicoes = [self.colunas.index(chave) for chave in chaves]
+        self._abrir_arquivo = abrir_arquivo
+        self._formato = formato
+        self._log_callback = log_callback
+        self._partes = [parte for parte in partes if os.path.exists(parte)]
+        self._chaves_existentes = set()
+        self.existentes = 0
+        mesmo_cabecalho = True
+        for parte in self._partes:
+            linhas = iterar_arquivo_saida(parte, formato)
+            cabecalho = [str(coluna) for coluna in next(linhas)]
+            if cabecalho[:len(self.colunas)] != [str(coluna) for coluna in self.colunas]:
+                raise ValueError(f"O arquivo de saída {os.path.basename(parte)} tem colunas diferentes; "
+                                 f"não é possível atualizá-lo (escolha outro arquivo de saída).")
+            mesmo_cabecalho = mesmo_cabecalho and len(cabecalho) == len(self.colunas)
+            for linha in linhas:
+                self._chaves_existentes.add(self._chave(self._completar(linha)))
+                self.existentes += 1
+        # Anexar no fim só com um único arquivo existente, com exatamente as mesmas colunas
+        self._anexar_arquivo = anexar_arquivo if self._partes == [caminho] and mesmo_cabecalho else None
+        self._novas = {}
+        self.substituidas = self.adicionadas = 0
+        self.total = 0
+        self.anexadas = False
+        self.arquivos = [caminho]
+
+    def _completar(self, linha):
+        return (list(linha) + [None] * len(self.colunas))[:len(self.colunas)]
+
+    def _chave(self, valores):
+        # Código limpo dos dois lados: '4.0' (texto), 4.0 e 4 lidos do arquivo são a mesma chave
+        return tuple(limpar_codigo(valores[posicao]) for posicao in self._posicoes)
+
+    def escrever(self, linha):
+        if isinstance(linha, dict):
+            linha = [linha.get(coluna) for coluna in self.colunas]
+        valores = [valor_celula(valor) for valor in linha]
+        self._novas.setdefault(self._chave(valores), []).append(valores)
+        self.linhas += 1
+
+    def _linhas_existentes(self):
+        for parte in self._partes:
+            linhas = iterar_arquivo_saida(parte, self._formato)
+            next(linhas)
+            for linha in linhas:
+                yield self._completar(linha)
+
+    def _anexar(self):
+        tamanho = os.path.getsize(self.caminho)
+        try:
+            with self._anexar_arquivo() as saida:
+                for linhas in self._novas.values():
+                    self.adicionadas += 1
+                    saida.escrever_linhas(linhas)
+        except BaseException:
+            # Nunca um arquivo com linhas pela metade: volta ao conteúdo anterior
+            os.truncate(self.caminho, tamanho)
+            raise
+        self.anexadas = True
+        self.total = self.existentes + saida.linhas
+
+    def _regravar(self):
+        gravadas = set()
+        with self._abrir_arquivo() as saida:
+            for valores in self._linhas_existentes():
+                chave = self._chave(valores)
+                if chave not in self._novas:
+                    saida.escrever(valores)
+                elif chave not in gravadas:
+                    # O grupo inteiro de linhas novas entra no lugar da primeira linha antiga da chave
+                    gravadas.add(chave)
+                    self.substituidas += 1
+                    saida.escrever_linhas(self._novas[chave])
+            for chave, linhas in self._novas.items():
+                if chave not in gravadas:
+                    self.adicionadas += 1
+                    saida.escrever_linhas(linhas)
+        self.total = saida.linhas
+        # Partes numeradas que sobraram de uma gravação anterior maior são removidas pela SaidaEmArquivos
+        self.arquivos = getattr(saida, 'arquivos', [self.caminho])
+
+    def fechar(self):
+        if self._anexar_arquivo is not None and self._chaves_existentes.isdisjoint(self._novas):
+            self._anexar()
+        else:
+            self._regravar()
+        if self._log_callback:
+            self._log_callback(self.resumo())
+
+    def resumo(self):
+        modo = "anexadas no fim, sem regravar o arquivo" if self.anexadas else "arquivo regravado"
+        return (f"Upsert: {self.substituidas} chaves substituídas, {self.adicionadas} adicionadas, "
+                f"{self.total} linhas no arquivo ({self.existentes} antes; {modo})")
+
+    def __exit__(self, tipo_erro, erro, traceback):
+        if tipo_erro is None:
+            self.fechar()
+        return False
+
+
+def abrir_saida(caminho, colunas, formato=None, limite_linhas=None, dividir_em=None, upsert=None, log_callback=None):
+    """
+    Abre o writer de saída em streaming. Formato pela extensão do arquivo ou por `formato`:
+    xlsx (xlsxwriter se instalado, senão openpyxl write_only), csv, parquet ou jsonl.
+    `limite_linhas` (padrão LIMITE_LINHAS_SAIDA no .xlsx, sem limite nos demais) e `dividir_em`
+    ('abas' ou 'arquivos', padrão DIVISAO_SAIDA) controlam a divisão de saídas grandes. No .xlsx o
+    limite nunca passa de LIMITE_LINHAS_EXCEL; nos outros formatos a divisão é sempre em arquivos.
+    `upsert` (True = chave na primeira coluna, ou lista de colunas de chave) atualiza o arquivo
+    existente em vez de recriá-lo (ver SaidaUpsert).
+    """
+    formato = formato_saida(caminho, formato)
+    dividir_em = dividir_em or DIVISAO_SAIDA
+    if dividir_em not in ('abas', 'arquivos'):
+        raise ValueError(f"Divisão de saída inválida: {dividir_em} (use 'abas' ou 'arquivos')")
+    if limite_linhas is None:
+        limite_linhas = LIMITE_LINHAS_SAIDA if formato == 'xlsx' else 0
+    if formato == 'xlsx':
+        limite_linhas = min(limite_linhas or LIMITE_LINHAS_EXCEL, LIMITE_LINHAS_EXCEL)
+    em_arquivos = bool(limite_linhas) and (dividir_em == 'arquivos' or formato != 'xlsx')
+    if upsert:
+        chaves = [list(colunas)[0]] if upsert is True else list(upsert)
+        partes = [caminho]
+        if em_arquivos:
+            base, extensao = os.path.splitext(caminho)
+            while os.path.exists(f"{base}_{len(partes) + 1}{extensao}"):
+                partes.append(f"{base}_{len(partes) + 1}{extensao}")
+        anexar_arquivo = None
+        if formato in ('csv', 'jsonl') and not em_arquivos:
+            classe = SaidaCsv if formato == 'csv' else SaidaJsonl
+            anexar_arquivo = lambda: classe(caminho, colunas, anexar=True)
+        return SaidaUpsert(caminho, colunas, chaves, partes,
+                           lambda: abrir_saida(caminho, colunas, formato, limite_linhas, dividir_em,
+                                               log_callback=log_callback),
+                           formato, log_callback, anexar_arquivo)
+    if em_arquivos:
+        return SaidaEmArquivos(caminho, colunas, limite_linhas,
+                               lambda caminho_parte: _abrir_arquivo_saida(caminho_parte, colunas, formato,
+                                                                          log_callback=log_callback))
+    return _abrir_arquivo_saida(caminho, colunas, formato, limite_linhas, log_callback)
+
+
+def salvar_dataframe(df, caminho, formato=None, limite_linhas=None, dividir_em=None, upsert=None, log_callback=None):
+    """Grava o DataFrame inteiro pela saída em streaming (substitui df.to_excel(caminho, index=False))"""
+    with abrir_saida(caminho, df.columns, formato, limite_linhas, dividir_em, upsert, log_callback) as saida:
+        saida.escrever_dataframe(df)
+    return saida.linhas
+
+
+def salvar_linhas(linhas, colunas, caminho, formato=None, limite_linhas=None, dividir_em=None, upsert=None, log_callback=None):
+    """Grava uma sequência de linhas (dicts ou sequências na ordem das colunas) pela saída em streaming"""
+    with abrir_saida(caminho, colunas, formato, limite_linhas, dividir_em, upsert, log_callback) as saida:
+        saida.escrever_linhas(linhas)
+    return saida.linhas
+
+
+# Modo delta: grava só as linhas novas, alteradas ou removidas desde a execução anterior.
+# O estado (hash do conteúdo de cada linha, agrupado pelo código da primeira coluna) fica
+# em um JSON ao lado da saída e só é atualizado quando a gravação termina sem erro.
+COLUNA_DELTA = 'Situação Delta'
+
+
+def caminho_estado_delta(caminho_saida):
+    """Arquivo de estado do modo delta: saida.xlsx -> saida.delta.json"""
+    return os.path.splitext(str(caminho_saida))[0] + '.delta.json'
+
+
+def hash_linha(valores):
+    """
+    Hash curto do conteúdo de uma linha (valores já convertidos por valor_celula). Floats inteiros
+    contam como int e None como '': a mesma origem lida em memória (999.0, coluna com vazios)
+    ou em streaming (999) tem o mesmo hash.
+    """
+    normalizados = ['' if valor is None else int(valor) if isinstance(valor, float) and valor.is_integer() else valor
+                    for valor in valores]
+    texto = json.dumps(normalizados, ensure_ascii=False, default=str)
+    return hashlib.blake2b(texto.encode('utf-8'), digest_size=12).hexdigest()
+
+
+class SaidaDelta(SaidaTabular):
+    """
+    Filtra as linhas pelo estado da execução anterior e grava no writer interno só as
+    diferenças, com a coluna COLUNA_DELTA ('novo', 'alterado' ou 'removido'). Linhas repetidas
+    do mesmo código são comparadas pela ordem em que aparecem. As removidas saem no fim, só com
+    o código preenchido. `linhas` conta as linhas recebidas; `gravadas`, as que foram para a saída.
+    """
+    motor = 'delta'
+
+    def __init__(self, caminho, colunas, caminho_estado, abrir_arquivo, log_callback=None):
+        super().__init__(caminho, colunas)
+        self.caminho_estado = caminho_estado
+        self.novos = self.alterados = self.removidos = self.iguais = 0
+        self._atuais = defaultdict(list)
+        self._anteriores = self._carregar_estado(log_callback)
+        self._saida = abrir_arquivo(caminho, self.colunas + [COLUNA_DELTA])
+
+    def _carregar_estado(self, log_callback):
+        if not os.path.exists(self.caminho_estado):
+            if log_callback:
+                log_callback("Modo delta: sem estado anterior, todas as linhas saem como novas")
+            return {}
+        with open(self.caminho_estado, encoding='utf-8') as f:
+            estado = json.load(f)
+        if estado.get('colunas') != [str(coluna) for coluna in self.colunas]:
+            if log_callback:
+                log_callback("Modo delta: colunas mudaram desde a última execução, estado anterior descartado")
+            return {}
+        if log_callback:
+            log_callback(f"Modo delta: estado anterior com {sum(map(len, estado['linhas'].values()))} linhas")
+        return estado['linhas']
+
+    @property
+    def gravadas(self):
+        return self._saida.linhas
+
+    def escrever(self, linha):
+        if isinstance(linha, dict):
+            linha = [linha.get(coluna) for coluna in self.colunas]
+        valores = [valor_celula(valor) for valor in linha]
+        # Código limpo, como no upsert: 999.0 (em memória) e 999 (streaming) são o mesmo código
+        codigo = limpar_codigo(valores[0])
+        hashes = self._atuais[codigo]
+        anteriores = self._anteriores.get(codigo, ())
+        hash_atual = hash_linha(valores)
+        posicao = len(hashes)
+        hashes.append(hash_atual)
+        self.linhas += 1
+        if posicao >= len(anteriores):
+            self.novos += 1
+            self._saida.escrever(valores + ['novo'])
+        elif anteriores[posicao] != hash_atual:
+            self.alterados += 1
+            self._saida.escrever(valores + ['alterado'])
+        else:
+            self.iguais += 1
+
+    def resumo(self):
+        return (f"Modo delta: {self.novos} novas, {self.alterados} alteradas, {self.removidos} removidas, "
+                f"{self.iguais} sem alteração ({self.gravadas} linhas gravadas)")
+
+    def fechar(self):
+        vazios = [None] * (len(self.colunas) - 1)
+        for codigo, anteriores in self._anteriores.items():
+            for _ in anteriores[len(self._atuais.get(codigo, ())):]:
+                self.removidos += 1
+                self._saida.escrever([codigo] + vazios + ['removido'])
+        self._saida.fechar()
+        self._salvar_estado()
+
+    def _salvar_estado(self):
+        estado = {'colunas': [str(coluna) for coluna in self.colunas], 'linhas': self._atuais}
+        temporario = self.caminho_estado + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(estado, f, ensure_ascii=False)
+        os.replace(temporario, self.caminho_estado)
+
+    def __exit__(self, tipo_erro, erro, traceback):
+        if tipo_erro is None:
+            self.fechar()
+        else:
+            # Com erro a saída é descartada e o estado anterior fica intacto
+            self._saida.__exit__(tipo_erro, erro, traceback)
+        return False
+
+
+def abrir_saida_delta(caminho, colunas, caminho_estado=None, log_callback=None, formato=None):
+    """Abre a saída em modo delta (ver SaidaDelta); estado padrão em caminho_estado_delta(caminho)"""
+    formato = formato_saida(caminho, formato)
+    return SaidaDelta(caminho, colunas, caminho_estado or caminho_estado_delta(caminho),
+                      lambda caminho_saida, colunas_saida: abrir_saida(caminho_saida, colunas_saida, formato,
+                                                                       log_callback=log_callback),
+                      log_callback)
+
+
 # Funções de processamento para cada modelo
-def processar_one(pasta_pdf, excel_entrada, excel_saida, log_callback, progress_callback):
+def processar_one(pasta_pdf, excel_entrada, excel_saida, log_callback, progress_callback, contatos=None, upsert=False):
     codigos_empresas = []
     # Aceita tanto "12-" quanto "12 -"
     padrao = r'^(\d+)\s*-'
@@ -65,46 +1077,35 @@ def processar_one(pasta_pdf, excel_entrada, excel_saida, log_callback, progress_
     for arquivo in pdf_files:
         match = re.match(padrao, arquivo)
         if match:
-            codigo = match.group(1)
-            codigos_empresas.append((codigo, arquivo))
-            log_callback(f"Código encontrado: {codigo} - {arquivo}")
+            codigos_empresas.append((match.group(1), arquivo))
+    log_callback(f"Códigos encontrados nos nomes dos PDFs: {len(codigos_empresas)}")
     
     progress_callback(0.4)
     log_callback("Lendo Excel de Contatos Onvio...")
-    df_excel = pd.read_excel(excel_entrada)
-    if df_excel.shape[1] < 4:
+    diretorio = obter_diretorio_contatos(excel_entrada, contatos, log_callback)
+    if len(diretorio.colunas) < 4:
         raise ValueError("O arquivo Excel deve ter pelo menos 4 colunas (A-D).")
-    df_excel.iloc[:, 0] = df_excel.iloc[:, 0].astype(str)
     
     progress_callback(0.6)
     log_callback("Comparando códigos e criando resultados...")
-    resultados = []
-    for codigo, arquivo_pdf in codigos_empresas:
-        resultado = {
-            'Código': codigo,
-            'Empresa': '',
-            'Contato Onvio': '',
-            'Grupo Onvio': '',
-            'Caminho': os.path.join(pasta_pdf, arquivo_pdf)
-        }
-        if codigo in df_excel.iloc[:, 0].values:
-            linha = df_excel[df_excel.iloc[:, 0] == codigo].iloc[0]
-            resultado.update({
-                'Empresa': linha.iloc[1],
-                'Contato Onvio': linha.iloc[2],
-                'Grupo Onvio': linha.iloc[3]
-            })
-            log_callback(f"Correspondência encontrada para código {codigo}")
-        else:
-            log_callback(f"Código {codigo} não encontrado no Excel")
-        resultados.append(resultado)
+    # Left join dos PDFs com os contatos pelo código (primeira linha do código prevalece)
+    contatos_codigo = diretorio.tabela_por_codigo(primeira=True).iloc[:, 1:4].set_axis(
+        ['Empresa', 'Contato Onvio', 'Grupo Onvio'], axis=1)
+    df_pdfs = pd.DataFrame(codigos_empresas, columns=['Código', 'Arquivo'])
+    df_resultado = df_pdfs[['Código']].join(contatos_codigo, on='Código')
+    encontrados = df_pdfs['Código'].isin(contatos_codigo.index)
+    df_resultado.loc[~encontrados, ['Empresa', 'Contato Onvio', 'Grupo Onvio']] = ''
+    df_resultado['Caminho'] = [os.path.join(pasta_pdf, arquivo) for arquivo in df_pdfs['Arquivo']]
+
+    log_callback(f"Correspondências encontradas: {int(encontrados.sum())}")
+    for codigo in df_pdfs.loc[~encontrados, 'Código']:
+        log_callback(f"Código {codigo} não encontrado no Excel")
     
     progress_callback(0.8)
     log_callback("Salvando arquivo Excel de saída...")
-    df_resultado = pd.DataFrame(resultados)
-    df_resultado.to_excel(excel_saida, index=False)
+    salvar_dataframe(df_resultado, excel_saida, upsert=upsert, log_callback=log_callback)
     log_callback(f"Arquivo Excel gerado com sucesso: {excel_saida}")
-    return len(resultados)
+    return len(df_resultado)
 
 def verifica_certificado_cobranca(data_vencimento):
     hoje = date.today()
@@ -122,17 +1123,141 @@ def verifica_certificado_cobranca(data_vencimento):
     else:
         return 6
 
-def processar_cobranca(caminho_pdf, excel_entrada, excel_saida, log_callback, progress_callback):
-    contatos_dict = carregar_contatos_excel(excel_entrada)
+# Texto de PDFs: página a página, com cache entre execuções (CacheTextoPdf) e, nos PDFs grandes,
+# extração em paralelo (um processo por núcleo). TRABALHADORES_PDF None = os.cpu_count();
+# PDFs com menos de PAGINAS_MINIMAS_PARALELO páginas são lidos no próprio processo.
+# Cada tarefa reabre o PDF (o que custa caro em PDFs grandes), então as faixas são poucas e
+# grandes: duas por trabalhador, com pelo menos PAGINAS_POR_TAREFA_PDF páginas.
+TRABALHADORES_PDF = None
+PAGINAS_MINIMAS_PARALELO = 50
+PAGINAS_POR_TAREFA_PDF = 25
+
+
+def _abrir_cache_texto_pdf():
+    try:
+        return CacheTextoPdf()
+    except OSError:
+        return None  # cache é só otimização
+
+
+def _textos_do_cache(textos, caminho_pdf, progress_callback=None, log_callback=None):
+    """Gera os textos já carregados do cache, com o mesmo progresso da extração"""
+    if log_callback:
+        log_callback(f"Texto do PDF reaproveitado do cache: {os.path.basename(caminho_pdf)} ({len(textos)} páginas)")
+    for i, texto in enumerate(textos):
+        yield texto
+        if progress_callback:
+            progress_callback((i + 1) / len(textos))
+
+
+def _textos_documento(pdf, progress_callback=None):
+    """Gera o texto de cada página de um PDF já aberto, liberando o cache de cada página ao terminar"""
+    total_paginas = len(pdf.pages)
+    for i, pagina in enumerate(pdf.pages):
+        texto = pagina.extract_text()
+        pagina.close()
+        yield texto
+        if progress_callback:
+            progress_callback((i + 1) / total_paginas)
+
+
+def iterar_textos_pdf(caminho_pdf, progress_callback=None, log_callback=None):
+    """
+    Gera o texto de cada página (None quando a página não tem texto), na ordem do PDF.
+    PDF já lido antes (mesmo conteúdo) vem do cache, sem abrir o pdfplumber; senão as páginas
+    são extraídas uma a uma, com o cache de cada página liberado assim que ela termina, e o
+    texto é guardado no cache no fim. progress_callback recebe a fração de páginas lidas (0 a 1).
+    """
+    caminho_pdf = arquivo_local(caminho_pdf)
+    cache = _abrir_cache_texto_pdf()
+    textos = cache.carregar(caminho_pdf) if cache else None
+    if textos is not None:
+        yield from _textos_do_cache(textos, caminho_pdf, progress_callback, log_callback)
+        return
+
+    textos = []
+    with pdfplumber.open(caminho_pdf) as pdf:
+        for texto in _textos_documento(pdf, progress_callback):
+            textos.append(texto)
+            yield texto
+    if cache:
+        cache.salvar(caminho_pdf, textos)
+
+
+def _textos_pdf_faixa(caminho_pdf, inicio, fim):
+    """Tarefa de cada processo: abre o PDF e extrai o texto das páginas [inicio, fim)"""
+    textos = []
+    with pdfplumber.open(caminho_pdf) as pdf:
+        for pagina in pdf.pages[inicio:fim]:
+            textos.append(pagina.extract_text())
+            pagina.close()
+    return textos
+
+
+def extrair_textos_pdf(caminho_pdf, progress_callback=None, log_callback=None, trabalhadores=None):
+    """
+    Lista com o texto de cada página, na ordem do PDF (ver iterar_textos_pdf). Sem cache e com
+    mais de um trabalhador, as páginas são divididas em faixas entre processos; cada processo abre
+    o PDF por conta própria e as faixas são juntadas na ordem das páginas.
+    """
+    caminho_pdf = arquivo_local(caminho_pdf)
+    trabalhadores = trabalhadores or TRABALHADORES_PDF or os.cpu_count() or 1
+    # Cache consultado uma única vez; o texto carregado segue direto para o retorno
+    cache = _abrir_cache_texto_pdf()
+    textos = cache.carregar(caminho_pdf) if cache else None
+    if textos is not None:
+        return list(_textos_do_cache(textos, caminho_pdf, progress_callback, log_callback))
+    with pdfplumber.open(caminho_pdf) as pdf:
+        total_paginas = len(pdf.pages)
+        if trabalhadores <= 1 or total_paginas < PAGINAS_MINIMAS_PARALELO:
+            # PDF pequeno: extraído no próprio processo, com o documento já aberto
+            textos = list(_textos_documento(pdf, progress_callback))
+    if textos is not None:
+        if cache:
+            cache.salvar(caminho_pdf, textos)
+        return textos
+
+    tamanho_faixa = max(PAGINAS_POR_TAREFA_PDF, math.ceil(total_paginas / (trabalhadores * 2)))
+    faixas = [(inicio, min(inicio + tamanho_faixa, total_paginas))
+              for inicio in range(0, total_paginas, tamanho_faixa)]
+    trabalhadores = min(trabalhadores, len(faixas))
+    if log_callback:
+        log_callback(f"Lendo {total_paginas} páginas em {trabalhadores} processos")
+    resultados = [None] * len(faixas)
+    paginas_lidas = 0
+    with ProcessPoolExecutor(max_workers=trabalhadores) as executor:
+        tarefas = {executor.submit(_textos_pdf_faixa, caminho_pdf, inicio, fim): posicao
+                   for posicao, (inicio, fim) in enumerate(faixas)}
+        for tarefa in as_completed(tarefas):
+            posicao = tarefas[tarefa]
+            resultados[posicao] = tarefa.result()
+            inicio, fim = faixas[posicao]
+            paginas_lidas += fim - inicio
+            if progress_callback:
+                progress_callback(paginas_lidas / total_paginas)
+    textos = [texto for resultado in resultados for texto in resultado]
+    if cache:
+        cache.salvar(caminho_pdf, textos)
+    return textos
+
+
+def linhas_texto_pdf(caminho_pdf, progress_callback=None, log_callback=None):
+    """
+    Gera as linhas de texto do PDF página a página, sem montar o texto do documento inteiro.
+    Páginas sem texto (extract_text() devolve None) não geram linhas.
+    """
+    for texto in iterar_textos_pdf(caminho_pdf, progress_callback, log_callback):
+        if texto:
+            yield from texto.split('\n')
+
+
+def processar_cobranca(caminho_pdf, excel_entrada, excel_saida, log_callback, progress_callback, contatos=None, upsert=False):
+    contatos_dict = obter_diretorio_contatos(excel_entrada, contatos, log_callback).contatos_por_codigo()
     log_callback("Lendo arquivo PDF...")
     progress_callback(0.2)
     
-    with pdfplumber.open(caminho_pdf) as pdf:
-        texto_completo = ""
-        for pagina in pdf.pages:
-            texto_completo += pagina.extract_text()
-    
-    linhas_texto = texto_completo.split('\n')
+    # Linhas lidas página a página (progresso de 0.2 a 0.8 conforme as páginas)
+    linhas_texto = linhas_texto_pdf(caminho_pdf, lambda fracao: progress_callback(0.2 + 0.6 * fracao), log_callback)
     regex_cliente = re.compile(r'Cliente: (\d+)')
     regex_nome = re.compile(r'Nome: (.+)')
     regex_parcela = re.compile(r'(\d{2}/\d{2}/\d{4}) (\d{1,3}(?:\.\d{3})*,\d{2})')
@@ -141,7 +1266,6 @@ def processar_cobranca(caminho_pdf, excel_entrada, excel_saida, log_callback, pr
     codigo_atual = None
     empresa_atual = None
     
-    progress_callback(0.4)
     log_callback("Extraindo informações do PDF...")
     for linha in linhas_texto:
         match_cliente = regex_cliente.search(linha)
@@ -175,47 +1299,58 @@ def processar_cobranca(caminho_pdf, excel_entrada, excel_saida, log_callback, pr
                 'Carta de Aviso': carta
             })
     
-    linhas = []
-    for codigo, info_list in dados.items():
-        for info in info_list:
-            linhas.append(info)
-    
     progress_callback(0.8)
     log_callback("Salvando arquivo Excel de saída...")
-    df = pd.DataFrame(linhas)
-    df.to_excel(excel_saida, index=False)
+    colunas = ['Código', 'Empresa', 'Contato Onvio', 'Grupo Onvio', 'Valor da Parcela', 'Data de Vencimento', 'Carta de Aviso']
+    with abrir_saida(excel_saida, colunas, upsert=upsert, log_callback=log_callback) as saida:
+        for codigo, info_list in dados.items():
+            saida.escrever_linhas(info_list)
     log_callback(f"Arquivo Excel gerado com sucesso: {excel_saida}")
-    return len(linhas)
+    return saida.linhas
+
+def texto_cnpj_exato(valor):
+    """CNPJ como texto exato da célula: números inteiros sem '.0', texto apenas sem espaços"""
+    if valor is None:
+        return ''
+    if isinstance(valor, str):
+        return valor.strip()
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor).strip()
+
+
+def ler_base_contato(excel_base):
+    """
+    Lê o Excel Base (aba ativa, a partir da linha 2) em uma única passada com openpyxl
+    em modo read_only e gera tuplas (código limpo, nome, CNPJ em texto exato).
+    Linhas totalmente vazias são ignoradas.
+    """
+    wb = openpyxl.load_workbook(arquivo_local(excel_base), read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        for row in ws.iter_rows(min_row=2, max_col=3, values_only=True):
+            codigo, nome, cnpj = (tuple(row) + (None, None, None))[:3]
+            if codigo is None and nome is None and cnpj is None:
+                continue
+            yield limpar_codigo(codigo), nome, texto_cnpj_exato(cnpj)
+    finally:
+        wb.close()
+
 
-def processar_contato(excel_base, excel_entrada, excel_saida, log_callback, progress_callback):
+def processar_contato(excel_base, excel_entrada, excel_saida, log_callback, progress_callback, contatos=None, upsert=False):
     log_callback("Lendo Excel de Origem...")
     progress_callback(0.2)
-    df_origem = pd.read_excel(excel_base)
-
-    # Ler CNPJ direto com openpyxl para preservar valor exato (evita perda de precisão por float)
-    wb = openpyxl.load_workbook(excel_base, data_only=True)
-    ws = wb.active
-    cnpj_list = []
-    for row in ws.iter_rows(min_row=2, min_col=3, max_col=3):
-        cell = row[0]
-        if cell.value is not None:
-            if isinstance(cell.value, str):
-                cnpj_list.append(cell.value.strip())
-            else:
-                cnpj_list.append(str(int(cell.value)))
-        else:
-            cnpj_list.append('')
-    wb.close()
+    # Uma única passada pelo Excel Base: código, nome e CNPJ (texto exato, sem passar por float)
+    df_origem = pd.DataFrame(list(ler_base_contato(excel_base)), columns=['codigo_origem', 'nome_origem', 'cnpj'])
+    # CNPJ por código (a última ocorrência prevalece); linhas sem código ficam sem CNPJ
+    codigo_para_cnpj = dict(zip(df_origem['codigo_origem'], df_origem['cnpj']))
+    codigo_para_cnpj.pop('', None)
 
     log_callback("Lendo Excel de Contatos...")
     progress_callback(0.3)
-    df_contatos = pd.read_excel(excel_entrada)
-
-    # Selecionar colunas da origem (3 primeiras: código, nome, cnpj)
-    df_origem = df_origem.iloc[:, :3]
-    df_origem.columns = ['codigo_origem', 'nome_origem', 'cnpj']
-    # Substituir coluna cnpj pelos valores lidos com openpyxl
-    df_origem['cnpj'] = cnpj_list[:len(df_origem)]
+    # Cópia, pois as colunas são renomeadas abaixo e o diretório é compartilhado entre execuções
+    diretorio = obter_diretorio_contatos(excel_entrada, contatos, log_callback)
+    df_contatos = diretorio.df.copy()
 
     # Pegar todas as colunas do Excel de contatos
     num_cols_contato = df_contatos.shape[1]
@@ -231,9 +1366,10 @@ def processar_contato(excel_base, excel_entrada, excel_saida, log_callback, prog
     colunas_internas = ['codigo_contato', 'nome_contato', 'contato', 'grupo', '_cnpj_contato'] + [f'extra_{i}' for i in range(len(colunas_extras_nomes))]
     df_contatos.columns = colunas_internas[:num_cols_contato]
 
-    # Converter código para string para garantir comparação correta
-    df_origem['codigo_origem'] = df_origem['codigo_origem'].astype(str).str.strip()
-    df_contatos['codigo_contato'] = df_contatos['codigo_contato'].astype(str).str.strip()
+    # Código limpo dos dois lados (limpar_codigo): com um código vazio o pandas lê a coluna como
+    # float e o texto seria '10.0' contra '10' da origem. Contatos sem código não entram no merge.
+    df_contatos['codigo_contato'] = diretorio.codigos
+    df_contatos = df_contatos[df_contatos['codigo_contato'] != '']
 
     progress_callback(0.5)
     log_callback("Comparando códigos e mesclando contatos...")
@@ -241,26 +1377,25 @@ def processar_contato(excel_base, excel_entrada, excel_saida, log_callback, prog
     # Colunas do contato a trazer no merge (contato, grupo + extras, sem _cnpj_contato)
     colunas_merge = ['codigo_contato', 'contato', 'grupo'] + [f'extra_{i}' for i in range(len(colunas_extras_nomes))]
 
+    # Uma linha por código antes do merge, dos dois lados (a primeira ocorrência prevalece, como
+    # no drop_duplicates que antes era feito no fim sobre o resultado já multiplicado)
+    df_origem = df_origem.drop_duplicates(subset=['codigo_origem'])
+    duplicados_contato = df_contatos['codigo_contato'].duplicated()
+    if duplicados_contato.any():
+        log_callback(f"Códigos repetidos no Excel de Contatos: {int(duplicados_contato.sum())} linhas ignoradas "
+                     f"(mantida a primeira ocorrência)")
+    df_contatos = df_contatos.loc[~duplicados_contato, colunas_merge]
+
     # Fazer o merge baseado no código (left join - mantém todos da origem)
     df_merged = pd.merge(
         df_origem,
-        df_contatos[colunas_merge],
+        df_contatos,
         left_on='codigo_origem',
         right_on='codigo_contato',
-        how='left'
+        how='left',
+        validate='many_to_one'
     )
 
-    # Ler CNPJ do Excel base via openpyxl (coluna C) para preservar valor exato
-    codigo_para_cnpj = {}
-    wb_cnpj = openpyxl.load_workbook(excel_base, data_only=True)
-    ws_cnpj = wb_cnpj.active
-    for row in ws_cnpj.iter_rows(min_row=2, values_only=True):
-        if row[0] is not None:
-            cod = str(int(float(str(row[0]))))
-            cnpj_val = str(row[2]).strip() if len(row) > 2 and row[2] is not None else ''
-            codigo_para_cnpj[cod] = cnpj_val
-    wb_cnpj.close()
-
     # Criar DataFrame final: Codigo, Nome, Contato, Grupo, CNPJ (do base), extras do contato (Telefone, etc.)
     resultado_dict = {
         'Codigo': df_merged['codigo_origem'],
@@ -276,15 +1411,12 @@ def processar_contato(excel_base, excel_entrada, excel_saida, log_callback, prog
 
     df_resultado = pd.DataFrame(resultado_dict)
 
-    # Remover duplicatas baseadas no código
-    df_resultado = df_resultado.drop_duplicates(subset=['Codigo'])
-
     # Ordenar por código em ordem crescente
     df_resultado = df_resultado.sort_values(by='Codigo', key=lambda x: pd.to_numeric(x, errors='coerce')).reset_index(drop=True)
 
     progress_callback(0.8)
     log_callback("Salvando arquivo Excel de saída...")
-    df_resultado.to_excel(excel_saida, index=False)
+    salvar_dataframe(df_resultado, excel_saida, upsert=upsert, log_callback=log_callback)
     log_callback(f"Arquivo Excel gerado com sucesso: {excel_saida}")
     return len(df_resultado)
 
@@ -301,6 +1433,23 @@ def formatar_cnpj(cnpj):
     else:
         return cnpj_str.zfill(14)
 
+
+def formatar_cnpj_serie(serie):
+    """Versão vetorizada de formatar_cnpj (11 dígitos até CPF, 14 acima disso)"""
+    resultado = pd.Series('', index=serie.index, dtype=object)
+    preenchidos = serie.notna()
+    valores = serie[preenchidos]
+    if valores.empty:
+        return resultado
+    if not _caminho_rapido(valores):
+        resultado[preenchidos] = valores.map(formatar_cnpj)
+        return resultado
+    digitos = _texto_serie(valores).str.strip().str.replace(r'\D', '', regex=True)
+    cpf = digitos.str.len() <= 11
+    resultado[preenchidos] = digitos.str.zfill(11).where(cpf, digitos.str.zfill(14))
+    return resultado
+
+
 def verifica_certificado_comunicado(data_vencimento):
     hoje = datetime.today()
     dias_restantes = (data_vencimento - hoje).days
@@ -315,32 +1464,40 @@ def verifica_certificado_comunicado(data_vencimento):
     else:
         return 0
 
-def processar_comunicado(excel_base, excel_entrada, excel_saida, log_callback, progress_callback):
-    contatos_dict = carregar_contatos_excel(excel_entrada)
+def processar_comunicado(excel_base, excel_entrada, excel_saida, log_callback, progress_callback, contatos=None, delta=False, caminho_estado=None, upsert=False):
+    if delta and upsert:
+        raise ValueError("O modo delta não pode ser combinado com a atualização (upsert) da saída.")
     log_callback("Lendo Excel Base...")
     progress_callback(0.2)
     
+    # Só as colunas usadas: A (código), B (empresa), C (CNPJ), E (vencimento) e H (situação)
+    df_comparacao = ler_excel(excel_base, COLUNAS_ENTRADA["ComuniCertificado"])
+    codigos = limpar_codigo_serie(df_comparacao.iloc[:, 0])  # CORREÇÃO AQUI
+
+    if contatos is None and ENGINE_LEITURA_EXCEL is None:
+        # Sem diretório já carregado e sem calamine: só os contatos dos códigos do Excel Base, lidos
+        # em streaming (mais rápido e com bem menos memória que o pd.read_excel com openpyxl)
+        contatos_dict = carregar_contatos_excel(excel_entrada, set(codigos))
+    else:
+        contatos_dict = obter_diretorio_contatos(excel_entrada, contatos, log_callback).contatos_por_codigo()
+
     # CORREÇÃO: Log do dicionário de contatos para debug
     log_callback(f"Debug - Contatos carregados: {len(contatos_dict)} registros")
     log_callback(f"Debug - Primeiros 3 códigos do dicionário: {list(contatos_dict.keys())[:3]}")
-    
-    df_comparacao = pd.read_excel(excel_base)
-    codigos = df_comparacao.iloc[:, 0]
     empresas = df_comparacao.iloc[:, 1]
     cnpjs = df_comparacao.iloc[:, 2]
-    vencimentos = df_comparacao.iloc[:, 4]
-    situacoes = df_comparacao.iloc[:, 7]
+    cnpjs_formatados = formatar_cnpj_serie(cnpjs)
+    vencimentos = df_comparacao.iloc[:, 3]
+    situacoes = df_comparacao.iloc[:, 4]
     
     dados = {}
     progress_callback(0.4)
     log_callback("Comparando códigos e criando resultados...")
-    for codigo_atual, empresa, cnpj, vencimento, situacao in zip(codigos, empresas, cnpjs, vencimentos, situacoes):
-        codigo_atual = limpar_codigo(codigo_atual)  # CORREÇÃO AQUI
+    for codigo_atual, empresa, cnpj, cnpj_str, vencimento, situacao in zip(codigos, empresas, cnpjs, cnpjs_formatados, vencimentos, situacoes):
         log_callback(f"Debug - Código do Excel Base: '{codigo_atual}' (tipo: {type(codigo_atual)})")
         
         if not pd.isna(cnpj):
             carta = verifica_certificado_comunicado(vencimento)
-            cnpj_str = formatar_cnpj(cnpj)
             
             # CORREÇÃO: Debug para verificar busca no dicionário
             contato_info = contatos_dict.get(codigo_atual, {})
@@ -362,17 +1519,20 @@ def processar_comunicado(excel_base, excel_entrada, excel_saida, log_callback, p
                 'Carta de Aviso': carta
             })
     
-    linhas = []
-    for codigo, info_list in dados.items():
-        for info in info_list:
-            linhas.append(info)
-    
     progress_callback(0.8)
     log_callback("Salvando arquivo Excel de saída...")
-    df = pd.DataFrame(linhas)
-    df.to_excel(excel_saida, index=False)
+    colunas = ['Codigo', 'Empresa', 'Contato Onvio', 'Grupo Onvio', 'CNPJ', 'Vencimento', 'Carta de Aviso']
+    if delta:
+        saida = abrir_saida_delta(excel_saida, colunas, caminho_estado, log_callback)
+    else:
+        saida = abrir_saida(excel_saida, colunas, upsert=upsert, log_callback=log_callback)
+    with saida:
+        for codigo, info_list in dados.items():
+            saida.escrever_linhas(info_list)
+    if delta:
+        log_callback(saida.resumo())
     log_callback(f"Arquivo Excel gerado com sucesso: {excel_saida}")
-    return len(linhas)
+    return saida.linhas
 
 
 def normalizar_nome(nome):
@@ -382,6 +1542,20 @@ def normalizar_nome(nome):
     return str(nome).strip().lower()
 
 
+def normalizar_nome_serie(serie):
+    """Versão vetorizada de normalizar_nome"""
+    resultado = pd.Series('', index=serie.index, dtype=object)
+    preenchidos = serie.notna()
+    valores = serie[preenchidos]
+    if valores.empty:
+        return resultado
+    if not _caminho_rapido(valores):
+        resultado[preenchidos] = valores.map(normalizar_nome)
+        return resultado
+    resultado[preenchidos] = _texto_serie(valores).str.strip().str.lower()
+    return resultado
+
+
 def calcular_similaridade(str1, str2):
     """Calcula a similaridade entre duas strings (0 a 1) usando SequenceMatcher"""
     from difflib import SequenceMatcher
@@ -390,7 +1564,54 @@ def calcular_similaridade(str1, str2):
     return SequenceMatcher(None, str1, str2).ratio()
 
 
-def buscar_por_similaridade(nome_busca, contatos_por_nome, limite_similaridade=0.8):
+def calcular_similaridade_podada(str1, str2, minimo, superar=None, contadores=None):
+    """
+    Mesmo valor de calcular_similaridade, mas descarta cedo os pares que não podem atingir `minimo`
+    (ou superar estritamente `superar`, o melhor score atual) e retorna None nesses casos.
+    Os filtros são limites superiores exatos do ratio(), em ordem crescente de custo:
+    tamanho (real_quick_ratio) e caracteres em comum (quick_ratio).
+    `contadores` (opcional) acumula quantos pares foram podados em cada etapa e quantos ratio() rodaram.
+    """
+    from difflib import SequenceMatcher
+    if not str1 or not str2:
+        return 0.0 if minimo <= 0 and superar is None else None
+
+    def podado(limite_superior, etapa):
+        if limite_superior < minimo or (superar is not None and limite_superior <= superar):
+            if contadores is not None:
+                contadores[etapa] += 1
+            return True
+        return False
+
+    # Mesma fórmula do real_quick_ratio, sem o custo de montar o SequenceMatcher
+    total = len(str1) + len(str2)
+    if podado(2.0 * min(len(str1), len(str2)) / total, 'podadas_tamanho'):
+        return None
+
+    matcher = SequenceMatcher(None, str1, str2)
+    if podado(matcher.quick_ratio(), 'podadas_caracteres'):
+        return None
+
+    if contadores is not None:
+        contadores['ratio_completo'] += 1
+    return matcher.ratio()
+
+
+def novos_contadores_similaridade():
+    """Contadores usados por calcular_similaridade_podada"""
+    return {'podadas_tamanho': 0, 'podadas_caracteres': 0, 'ratio_completo': 0}
+
+
+def resumo_contadores_similaridade(contadores):
+    """Texto para o log com quantos ratio() completos foram evitados"""
+    evitados = contadores['podadas_tamanho'] + contadores['podadas_caracteres']
+    total = evitados + contadores['ratio_completo']
+    percentual = evitados / total if total else 0.0
+    return (f"Similaridade: {contadores['ratio_completo']} cálculos completos, {evitados} evitados "
+            f"({percentual:.0%}; tamanho: {contadores['podadas_tamanho']}, caracteres: {contadores['podadas_caracteres']})")
+
+
+def buscar_por_similaridade(nome_busca, contatos_por_nome, limite_similaridade=0.8, contadores=None):
     """
     Busca um nome no dicionário de contatos por similaridade.
     Retorna o contato_info se encontrar correspondência >= limite_similaridade, senão None.
@@ -402,7 +1623,11 @@ def buscar_por_similaridade(nome_busca, contatos_por_nome, limite_similaridade=0
     melhor_similaridade = 0.0
 
     for nome_contato, contato_info in contatos_por_nome.items():
-        similaridade = calcular_similaridade(nome_busca, nome_contato)
+        # Só interessa quem atinge o limite e supera estritamente o melhor atual
+        similaridade = calcular_similaridade_podada(nome_busca, nome_contato, limite_similaridade,
+                                                    melhor_similaridade, contadores)
+        if similaridade is None:
+            continue
         if similaridade >= limite_similaridade and similaridade > melhor_similaridade:
             melhor_similaridade = similaridade
             melhor_match = contato_info
@@ -410,130 +1635,600 @@ def buscar_por_similaridade(nome_busca, contatos_por_nome, limite_similaridade=0
     return melhor_match, melhor_similaridade
 
 
-def processar_all(excel_origem, excel_contato, excel_saida, log_callback, progress_callback):
+class IndiceSimilaridade:
+    """
+    Índice pré-construído para busca por similaridade de nomes.
+    Retorna exatamente o mesmo resultado de buscar_por_similaridade (mesmo contato, mesma
+    similaridade e mesmo desempate pela ordem do dicionário), mas só calcula o SequenceMatcher
+    para candidatos que ainda podem atingir o limite.
+
+    O filtro usa a contagem de caracteres em comum, que é um limite superior da similaridade:
+    se similaridade >= limite, os dois nomes compartilham pelo menos ceil(p * tamanho) caracteres,
+    com p = limite / (2 - limite). Cada nome é indexado apenas pelos seus caracteres mais raros
+    (prefix filtering), o que reduz a busca a poucos candidatos sem perder nenhum match.
+    """
+
+    def __init__(self, contatos_por_nome, limite_similaridade=0.8):
+        self.limite = limite_similaridade
+        self.nomes = list(contatos_por_nome.keys())
+        self.infos = list(contatos_por_nome.values())
+        # Com limite <= 0 qualquer nome é candidato: não há o que filtrar
+        self.varredura_linear = limite_similaridade <= 0
+        self.proporcao = limite_similaridade / (2 - limite_similaridade) if limite_similaridade < 1 else 1.0
+
+        tokens_por_nome = [self._tokens(nome) for nome in self.nomes]
+        # Contagem de caracteres de cada nome, usada no filtro de caracteres em comum
+        self.contagens = [Counter(nome) for nome in self.nomes]
+        self.frequencia = defaultdict(int)
+        for tokens in tokens_por_nome:
+            for token in tokens:
+                self.frequencia[token] += 1
+
+        self.postagens = defaultdict(list)
+        for posicao, tokens in enumerate(tokens_por_nome):
+            if not tokens:
+                continue
+            for token in self._prefixo(tokens):
+                self.postagens[token].append(posicao)
+
+    @staticmethod
+    def _tokens(nome):
+        """Converte o nome em tokens (caractere, n-ésima ocorrência), equivalente a um multiconjunto"""
+        contagem = defaultdict(int)
+        tokens = []
+        for caractere in nome:
+            contagem[caractere] += 1
+            tokens.append((caractere, contagem[caractere]))
+        return tokens
+
+    def _prefixo(self, tokens):
+        """Retorna os tokens mais raros que precisam ser compartilhados por qualquer match"""
+        # Margem de 1e-9 garante que erros de ponto flutuante só aumentem o prefixo (nunca perde match)
+        minimo_comum = max(1, math.ceil(self.proporcao * len(tokens) - 1e-9))
+        ordenados = sorted(tokens, key=lambda t: (self.frequencia.get(t, 0), t))
+        return ordenados[:len(tokens) - minimo_comum + 1]
+
+    def candidatos(self, nome_busca):
+        """Posições (na ordem do dicionário original) dos nomes que podem atingir o limite"""
+        if self.varredura_linear:
+            return range(len(self.nomes))
+        encontrados = set()
+        for token in self._prefixo(self._tokens(nome_busca)):
+            encontrados.update(self.postagens.get(token, ()))
+        return sorted(encontrados)
+
+    def buscar(self, nome_busca, contadores=None):
+        """Mesmo contrato de buscar_por_similaridade: retorna (contato_info, similaridade) ou (None, 0.0)"""
+        if not nome_busca:
+            return None, 0.0
+
+        melhor_match = None
+        melhor_similaridade = 0.0
+        tamanho_busca = len(nome_busca)
+        contagem_busca = Counter(nome_busca)
+
+        for posicao in self.candidatos(nome_busca):
+            nome_contato = self.nomes[posicao]
+            total = tamanho_busca + len(nome_contato)
+            # Mesmos limites superiores de calcular_similaridade_podada, com as contagens já prontas
+            limite_superior = 2.0 * min(tamanho_busca, len(nome_contato)) / total
+            if limite_superior < self.limite or limite_superior <= melhor_similaridade:
+                if contadores is not None:
+                    contadores['podadas_tamanho'] += 1
+                continue
+            contagem_contato = self.contagens[posicao]
+            comuns = sum(min(n, contagem_contato[c]) for c, n in contagem_busca.items())
+            limite_superior = 2.0 * comuns / total
+            if limite_superior < self.limite or limite_superior <= melhor_similaridade:
+                if contadores is not None:
+                    contadores['podadas_caracteres'] += 1
+                continue
+            if contadores is not None:
+                contadores['ratio_completo'] += 1
+            similaridade = calcular_similaridade(nome_busca, nome_contato)
+            if similaridade >= self.limite and similaridade > melhor_similaridade:
+                melhor_similaridade = similaridade
+                melhor_match = self.infos[posicao]
+
+        return melhor_match, melhor_similaridade
+
+
+# Cache local (snapshots de planilhas já lidas), limitado em tamanho
+CACHE_SNAPSHOTS_LIMITE_BYTES = 200 * 1024 * 1024
+
+
+def pasta_cache(subpasta=""):
+    """Pasta local de cache do M.E.G ONE (%LOCALAPPDATA%\\MEG_ONE no Windows, ~/.cache/MEG_ONE nos demais)"""
+    base = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache')
+    pasta = os.path.join(base, 'MEG_ONE', subpasta)
+    os.makedirs(pasta, exist_ok=True)
+    return pasta
+
+
+def hash_arquivo(caminho, tamanho_bloco=1024 * 1024):
+    """SHA-256 do conteúdo do arquivo, lido em blocos"""
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def limitar_tamanho_pasta(pasta, limite_bytes, padrao_extensao=""):
+    """Remove os arquivos usados há mais tempo (mtime) até a pasta caber em limite_bytes"""
+    arquivos = []
+    for nome in os.listdir(pasta):
+        caminho = os.path.join(pasta, nome)
+        if os.path.isfile(caminho) and nome.endswith(padrao_extensao):
+            info = os.stat(caminho)
+            arquivos.append((info.st_mtime, info.st_size, caminho))
+    total = sum(tamanho for _, tamanho, _ in arquivos)
+    removidos = 0
+    for _, tamanho, caminho in sorted(arquivos):
+        if total <= limite_bytes:
+            break
+        try:
+            os.remove(caminho)
+            total -= tamanho
+            removidos += 1
+        except OSError:
+            pass
+    return removidos
+
+
+def limpar_cache():
+    """Apaga todo o cache local. Retorna (arquivos removidos, bytes liberados)"""
+    pasta = pasta_cache()
+    arquivos = 0
+    total = 0
+    for raiz, _, nomes in os.walk(pasta):
+        for nome in nomes:
+            caminho = os.path.join(raiz, nome)
+            try:
+                total += os.path.getsize(caminho)
+                os.remove(caminho)
+                arquivos += 1
+            except OSError:
+                pass
+    return arquivos, total
+
+
+# Cópia local das entradas lidas de compartilhamentos de rede: cada arquivo é copiado uma vez
+# (leitura sequencial) e a cópia é reaproveitada enquanto o tamanho e a data não mudarem
+CACHE_ENTRADAS_LIMITE_BYTES = 1024 * 1024 * 1024
+STAGING_ENTRADAS = 'rede'  # 'rede' (só unidades de rede/UNC), 'sempre' ou 'nunca'
+
+
+def caminho_em_rede(caminho):
+    """True para caminhos UNC (\\\\servidor\\...) e unidades mapeadas de rede no Windows (ex.: Z:)"""
+    caminho = os.path.abspath(str(caminho))
+    if caminho.startswith(('\\\\', '//')):
+        return True
+    if os.name == 'nt':
+        unidade = os.path.splitdrive(caminho)[0]
+        return bool(unidade) and ctypes.windll.kernel32.GetDriveTypeW(unidade + '\\') == 4  # DRIVE_REMOTE
+    return False
+
+
+def arquivo_local(caminho):
+    """
+    Caminho a ser aberto pelos leitores (pd.read_excel, openpyxl, pdfplumber): para arquivos em
+    rede, uma cópia em %LOCALAPPDATA%\\MEG_ONE\\entradas; para os demais, o próprio caminho.
+    A cópia é identificada pelo caminho, tamanho e data de modificação do original.
+    """
+    if STAGING_ENTRADAS == 'nunca' or not isinstance(caminho, (str, os.PathLike)) or not os.path.isfile(caminho):
+        return caminho
+    if STAGING_ENTRADAS != 'sempre' and not caminho_em_rede(caminho):
+        return caminho
+    caminho_abs = os.path.abspath(caminho)
+    info = os.stat(caminho_abs)
+    pasta = pasta_cache('entradas')
+    prefixo = hashlib.sha1(os.path.normcase(caminho_abs).encode('utf-8')).hexdigest()[:16]
+    local = os.path.join(pasta, f"{prefixo}_{info.st_size}_{info.st_mtime_ns}{os.path.splitext(caminho_abs)[1]}")
+    if os.path.exists(local):
+        os.utime(local)  # marca como usado recentemente (LRU)
+        return local
+
+    # Versões anteriores do mesmo arquivo não servem mais
+    for nome in os.listdir(pasta):
+        if nome.startswith(prefixo + '_'):
+            try:
+                os.remove(os.path.join(pasta, nome))
+            except OSError:
+                pass
+    limitar_tamanho_pasta(pasta, max(CACHE_ENTRADAS_LIMITE_BYTES - info.st_size, 0))
+    temporario = f"{local}.{os.getpid()}.tmp"
+    shutil.copyfile(caminho_abs, temporario)
+    os.replace(temporario, local)
+    return local
+
+
+class CacheSnapshots:
+    """
+    Snapshots binários (pickle) de planilhas já lidas, para não repetir o parse do .xlsx
+    quando o arquivo não mudou. Cada arquivo de origem tem um registro com caminho, tamanho,
+    data de modificação e hash do conteúdo; o snapshot é endereçado pelo hash (mais a variante
+    de leitura), então uma cópia idêntica em outro caminho ou com outra data reaproveita o mesmo.
+    Os snapshots menos usados são removidos quando a pasta passa de limite_bytes.
+    """
+
+    def __init__(self, pasta=None, limite_bytes=CACHE_SNAPSHOTS_LIMITE_BYTES):
+        self.pasta = pasta or pasta_cache('snapshots')
+        self.limite_bytes = limite_bytes
+
+    @staticmethod
+    def _chave(*partes):
+        return hashlib.sha1('|'.join(partes).encode('utf-8')).hexdigest()
+
+    def carregar(self, caminho, leitor, variante="", log_callback=None):
+        """Retorna o snapshot de `caminho` ou chama leitor(caminho) e guarda o resultado"""
+        caminho_abs = os.path.abspath(caminho)
+        info = os.stat(caminho_abs)
+        caminho_registro = os.path.join(self.pasta, self._chave(caminho_abs, variante) + '.json')
+
+        registro = None
+        try:
+            with open(caminho_registro, 'r', encoding='utf-8') as f:
+                registro = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+        # Mesmo caminho, tamanho e data: confia no hash já calculado
+        if registro and registro.get('tamanho') == info.st_size and registro.get('mtime_ns') == info.st_mtime_ns:
+            conteudo_hash = registro['hash']
+        else:
+            conteudo_hash = hash_arquivo(arquivo_local(caminho_abs))
+
+        caminho_snapshot = os.path.join(self.pasta, self._chave(conteudo_hash, variante) + '.pkl')
+        dados = None
+        if os.path.exists(caminho_snapshot):
+            try:
+                with open(caminho_snapshot, 'rb') as f:
+                    dados = pickle.load(f)
+                os.utime(caminho_snapshot)  # marca como usado recentemente (LRU)
+                if log_callback:
+                    log_callback(f"Snapshot em cache reutilizado: {os.path.basename(caminho)}")
+            except Exception:
+                dados = None
+
+        if dados is None:
+            dados = leitor(caminho)
+            try:
+                temporario = caminho_snapshot + '.tmp'
+                with open(temporario, 'wb') as f:
+                    pickle.dump(dados, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temporario, caminho_snapshot)
+                limitar_tamanho_pasta(self.pasta, self.limite_bytes, '.pkl')
+            except OSError:
+                pass  # cache é só otimização: falha ao gravar não interrompe o processamento
+
+        try:
+            with open(caminho_registro, 'w', encoding='utf-8') as f:
+                json.dump({'caminho': caminho_abs, 'variante': variante, 'tamanho': info.st_size,
+                           'mtime_ns': info.st_mtime_ns, 'hash': conteudo_hash}, f)
+        except OSError:
+            pass
+
+        return dados
+
+
+CACHE_TEXTO_PDF_LIMITE_BYTES = 100 * 1024 * 1024
+
+
+class CacheTextoPdf:
+    """
+    Texto já extraído de cada página de PDFs lidos antes, para não repetir o pdfplumber quando
+    o mesmo PDF é reprocessado. Endereçado pelo hash do conteúdo do PDF (mais a versão do
+    pdfplumber, que pode mudar a extração): cada PDF vira um JSON comprimido (gzip) com a lista
+    de textos na ordem das páginas. Os menos usados são removidos quando a pasta passa de limite_bytes.
+    """
+    # Hash por (caminho, tamanho, data), para não reler o PDF a cada consulta na mesma sessão
+    _hashes = {}
+
+    def __init__(self, pasta=None, limite_bytes=CACHE_TEXTO_PDF_LIMITE_BYTES):
+        self.pasta = pasta or pasta_cache('texto_pdf')
+        self.limite_bytes = limite_bytes
+
+    def _arquivo(self, caminho_pdf):
+        caminho_abs = os.path.abspath(caminho_pdf)
+        info = os.stat(caminho_abs)
+        assinatura = (caminho_abs, info.st_size, info.st_mtime_ns)
+        conteudo_hash = self._hashes.get(assinatura)
+        if conteudo_hash is None:
+            conteudo_hash = self._hashes[assinatura] = hash_arquivo(caminho_abs)
+        chave = hashlib.sha1(f"{conteudo_hash}|pdfplumber {pdfplumber.__version__}".encode('utf-8')).hexdigest()
+        return os.path.join(self.pasta, chave + '.json.gz')
+
+    def carregar(self, caminho_pdf):
+        """Lista de textos por página (None em páginas sem texto) ou None se o PDF não está no cache"""
+        arquivo = self._arquivo(caminho_pdf)
+        try:
+            with gzip.open(arquivo, 'rt', encoding='utf-8') as f:
+                textos = json.load(f)
+            os.utime(arquivo)  # marca como usado recentemente (LRU)
+            return textos
+        except (OSError, EOFError, ValueError):
+            return None
+
+    def salvar(self, caminho_pdf, textos):
+        try:
+            arquivo = self._arquivo(caminho_pdf)
+            temporario = f"{arquivo}.{os.getpid()}.tmp"
+            with gzip.open(temporario, 'wt', encoding='utf-8') as f:
+                json.dump(textos, f, ensure_ascii=False)
+            os.replace(temporario, arquivo)
+            limitar_tamanho_pasta(self.pasta, self.limite_bytes, '.json.gz')
+        except OSError:
+            pass  # cache é só otimização: falha ao gravar não interrompe o processamento
+
+
+def ler_excel_com_snapshot(caminho, log_callback=None):
+    """ler_excel com snapshot local (CacheSnapshots); cai para a leitura direta se o cache falhar"""
+    try:
+        cache = CacheSnapshots()
+    except OSError:
+        return ler_excel(caminho)
+    # A engine entra na variante: trocar de engine não reaproveita snapshots da outra
+    return cache.carregar(caminho, ler_excel, f"read_excel:{ENGINE_LEITURA_EXCEL or 'padrao'}", log_callback)
+
+
+class ContactDirectory:
+    """
+    Excel de Contatos (Contatos Onvio / Excel de Contato) lido uma única vez e compartilhado
+    entre os modelos. Guarda o DataFrame original e índices O(1) por código limpo, por nome
+    normalizado e por CNPJ, além da busca por similaridade (os índices de CNPJ e de similaridade
+    são criados sob demanda, na primeira consulta).
+    A interface mantém o diretório carregado entre execuções e só relê o arquivo quando
+    a data de modificação ou o tamanho mudam (ver desatualizado()).
+    """
+
+    def __init__(self, caminho, log_callback=None):
+        self.caminho = caminho
+        self.assinatura = self.assinatura_arquivo(caminho)
+        self.df = ler_excel_com_snapshot(caminho, log_callback)
+        self.colunas = self.df.columns.tolist()
+        # Valores como objetos Python (mesmo formato que o iterrows entregava aos modelos)
+        self.valores = self.df.to_numpy(dtype=object)
+        self.codigos = limpar_codigo_serie(self.df.iloc[:, 0]).tolist() if self.colunas else []
+        self.nomes = normalizar_nome_serie(self.df.iloc[:, 1]).tolist() if len(self.colunas) > 1 else []
+
+        # Quando há chaves repetidas, a última linha prevalece (mesma regra dos dicionários dos modelos)
+        self._por_codigo = {codigo: pos for pos, codigo in enumerate(self.codigos) if codigo}
+        self._por_nome = {nome: pos for pos, nome in enumerate(self.nomes) if nome}
+
+        self._por_cnpj = None
+        self._indices_similaridade = {}
+        self._tabelas_por_codigo = {}
+
+    @staticmethod
+    def assinatura_arquivo(caminho):
+        """Data de modificação e tamanho do arquivo, usados para saber se é preciso reler"""
+        info = os.stat(caminho)
+        return info.st_mtime_ns, info.st_size
+
+    def desatualizado(self):
+        """True se o arquivo mudou (ou sumiu) desde a leitura"""
+        try:
+            return self.assinatura_arquivo(self.caminho) != self.assinatura
+        except OSError:
+            return True
+
+    def __len__(self):
+        return len(self.valores)
+
+    def linha(self, posicao):
+        """Valores da linha (na ordem das colunas do arquivo)"""
+        return self.valores[posicao]
+
+    def tabela_por_codigo(self, primeira=False):
+        """
+        Linhas de contato indexadas pelo código limpo, uma por código (para joins vetorizados).
+        Valores como objetos Python, na mesma forma de linha(); códigos vazios ficam de fora.
+        """
+        chave = 'primeira' if primeira else 'ultima'
+        if chave not in self._tabelas_por_codigo:
+            tabela = pd.DataFrame(self.valores, columns=self.colunas, dtype=object)
+            tabela.index = pd.Index(self.codigos, dtype=object)
+            tabela = tabela[tabela.index != ""]
+            tabela = tabela[~tabela.index.duplicated(keep='first' if primeira else 'last')]
+            self._tabelas_por_codigo[chave] = tabela
+        return self._tabelas_por_codigo[chave]
+
+    def posicao_por_codigo(self, codigo):
+        """Posição da linha com o código (limpo por limpar_codigo) ou None"""
+        return self._por_codigo.get(limpar_codigo(codigo))
+
+    def posicao_por_nome(self, nome):
+        """Posição da linha com o nome (normalizado por normalizar_nome) ou None"""
+        return self._por_nome.get(normalizar_nome(nome))
+
+    def posicao_por_cnpj(self, cnpj):
+        """Posição da linha com o CNPJ (com ou sem pontuação) ou None"""
+        if self._por_cnpj is None:
+            # CNPJ: primeira coluna com "cnpj" no nome, normalizada para 14 dígitos (a última linha prevalece)
+            self._por_cnpj = {}
+            colunas_cnpj = [i for i, col in enumerate(self.colunas) if 'cnpj' in str(col).lower()]
+            if colunas_cnpj:
+                for pos, valor in enumerate(formatar_cnpj_all_info_serie(self.df.iloc[:, colunas_cnpj[0]])):
+                    if valor.strip('0'):
+                        self._por_cnpj[valor] = pos
+        return self._por_cnpj.get(formatar_cnpj_all_info(cnpj))
+
+    def posicoes_por_codigo(self, codigos):
+        """Series de códigos já limpos → posições (NaN se ausente; a última linha do código prevalece)"""
+        return codigos.map(self._por_codigo)
+
+    def posicoes_por_nome(self, nomes):
+        """Series de nomes já normalizados → posições (NaN se ausente; a última linha do nome prevalece)"""
+        return nomes.map(self._por_nome)
+
+    def buscar_similar(self, nome, limite_similaridade=0.8, contadores=None):
+        """
+        Busca por similaridade entre os nomes normalizados (mesmo resultado de buscar_por_similaridade).
+        Retorna (posição, similaridade) ou (None, 0.0).
+        """
+        if limite_similaridade not in self._indices_similaridade:
+            self._indices_similaridade[limite_similaridade] = IndiceSimilaridade(self._por_nome, limite_similaridade)
+        return self._indices_similaridade[limite_similaridade].buscar(normalizar_nome(nome), contadores)
+
+    def contatos_por_codigo(self):
+        """Dicionário código → empresa/contato/grupo (a última linha de cada código prevalece)"""
+        if len(self.colunas) < 4:
+            return {}
+        contatos_dict = {}
+        for codigo, linha in zip(self.codigos, self.valores):
+            # Contatos sem código ficam de fora. O carregar_contatos_excel antigo os guardava na chave
+            # "", e então linhas sem código da base (ComuniCertificado) recebiam o contato/grupo do
+            # último contato sem código; agora saem sem contato, como qualquer código não encontrado.
+            if codigo:
+                empresa, contato, grupo = [None if pd.isna(v) else v for v in linha[1:4]]
+                contatos_dict[codigo] = {
+                    'empresa': empresa,
+                    'contato': contato,
+                    'grupo': grupo
+                }
+        return contatos_dict
+
+
+def obter_diretorio_contatos(excel_entrada, contatos=None, log_callback=None):
+    """Usa o diretório de contatos já carregado (mantido pela interface) ou lê o arquivo"""
+    if contatos is not None:
+        return contatos
+    return ContactDirectory(excel_entrada, log_callback)
+
+
+def _comparar_all(df_origem, diretorio, contadores_similaridade, log_callback):
+    """
+    Casa as linhas de df_origem (planilha inteira ou um bloco do modo streaming) com os contatos.
+    Retorna (df_resultado, correspondências por código, por nome exato, por similaridade).
+    """
+    # Obter nomes das colunas originais do Excel de Contato
+    col_names = diretorio.colunas
+
+    # Chaves normalizadas da origem (vazios viram '')
+    valores_a = df_origem.iloc[:, 0].astype(object)
+    valores_a = valores_a.where(valores_a.notna(), '')
+    if df_origem.shape[1] > 1:
+        valores_b = df_origem.iloc[:, 1].astype(object)
+        valores_b = valores_b.where(valores_b.notna(), '')
+    else:
+        valores_b = pd.Series('', index=df_origem.index, dtype=object)
+    codigos_limpos = limpar_codigo_serie(valores_a)
+    nomes_normalizados_a = normalizar_nome_serie(valores_a)
+    nomes_normalizados_b = normalizar_nome_serie(valores_b)
+
+    # 1. Código (coluna A) → 2. nome exato (coluna A) → 3. nome exato (coluna B), cada etapa só nas linhas pendentes
+    posicoes = diretorio.posicoes_por_codigo(codigos_limpos)
+    correspondencias_codigo = int(posicoes.notna().sum())
+    posicoes = posicoes.fillna(diretorio.posicoes_por_nome(nomes_normalizados_a))
+    posicoes = posicoes.fillna(diretorio.posicoes_por_nome(nomes_normalizados_b))
+    correspondencias_nome_exato = int(posicoes.notna().sum()) - correspondencias_codigo
+
+    # 4/5. Similaridade (coluna A, depois coluna B) - 80%, apenas nas linhas que sobraram
+    correspondencias_nome_similar = 0
+    for indice in posicoes.index[posicoes.isna()]:
+        for valor, nome_normalizado in ((valores_a[indice], nomes_normalizados_a[indice]),
+                                        (valores_b[indice], nomes_normalizados_b[indice])):
+            if not nome_normalizado:
+                continue
+            posicao, similaridade = diretorio.buscar_similar(nome_normalizado, 0.8, contadores_similaridade)
+            if posicao is not None:
+                posicoes[indice] = posicao
+                correspondencias_nome_similar += 1
+                nome_contato = diretorio.linha(posicao)[1]
+                log_callback(f"Similaridade {similaridade:.0%}: '{valor}' -> '{nome_contato if pd.notna(nome_contato) else ''}'")
+                break
+
+    encontrados = posicoes.notna()
+
+    # Sem correspondência - mantém dados originais com colunas em branco
+    df_resultado = pd.DataFrame({
+        col_names[0]: valores_a,
+        col_names[1]: valores_b.where(valores_b.map(bool), valores_a),
+        col_names[2]: '',
+        col_names[3]: ''
+    }, dtype=object)
+
+    # Com correspondência - dados do contato (vazios viram '', exceto o código)
+    linhas_contato = diretorio.valores[posicoes[encontrados].astype(int).to_numpy()]
+    for i, coluna in enumerate(col_names[:4]):
+        valores = pd.Series(linhas_contato[:, i], index=posicoes.index[encontrados], dtype=object)
+        if i > 0:
+            valores = valores.where(valores.notna(), '')
+        df_resultado.loc[encontrados, coluna] = valores
+    df_resultado = df_resultado.reset_index(drop=True)
+    return df_resultado, correspondencias_codigo, correspondencias_nome_exato, correspondencias_nome_similar
+
+
+def processar_all(excel_origem, excel_contato, excel_saida, log_callback, progress_callback, contatos=None, tamanho_bloco=None, upsert=False):
     """
     Modelo ALL: Compara Excel de Origem com Excel de Contato.
     Suporta comparação por código (coluna A) OU por nome da empresa (coluna A ou B).
     Mantém todos os registros do Excel de Origem, preenchendo Contato e Grupo quando houver correspondência.
+    Origens grandes são processadas em blocos (ver tamanho_bloco_streaming).
     """
     log_callback("Lendo Excel de Origem...")
     progress_callback(0.2)
 
-    # Ler Excel de Origem
-    df_origem = pd.read_excel(excel_origem)
-    log_callback(f"Registros no Excel de Origem: {len(df_origem)}")
-    log_callback(f"Colunas encontradas: {df_origem.shape[1]}")
+    tamanho_bloco = tamanho_bloco_streaming(excel_origem, tamanho_bloco)
+    if tamanho_bloco:
+        log_callback(f"Modo streaming: Excel de Origem lido em blocos de {tamanho_bloco} linhas")
+    else:
+        # Ler Excel de Origem
+        df_origem = ler_excel(excel_origem)
+        log_callback(f"Registros no Excel de Origem: {len(df_origem)}")
+        log_callback(f"Colunas encontradas: {df_origem.shape[1]}")
 
     progress_callback(0.4)
     log_callback("Lendo Excel de Contato...")
 
-    # Ler Excel de Contato (4 colunas: código, nome, contato, grupo)
-    df_contato = pd.read_excel(excel_contato)
-    if df_contato.shape[1] < 4:
+    # Excel de Contato (4 colunas: código, nome, contato, grupo), com busca por código e por nome
+    diretorio = obter_diretorio_contatos(excel_contato, contatos, log_callback)
+    if len(diretorio.colunas) < 4:
         raise ValueError("O Excel de Contato deve ter pelo menos 4 colunas (Código, Nome, Contato, Grupo).")
 
-    log_callback(f"Registros no Excel de Contato: {len(df_contato)}")
-
-    # Criar dicionários de contatos para busca rápida (por código e por nome)
-    contatos_por_codigo = {}
-    contatos_por_nome = {}
+    log_callback(f"Registros no Excel de Contato: {len(diretorio)}")
 
-    for _, row in df_contato.iterrows():
-        codigo = limpar_codigo(row.iloc[0])
-        nome = normalizar_nome(row.iloc[1])
-        contato_info = {
-            'codigo': row.iloc[0],
-            'nome': row.iloc[1] if pd.notna(row.iloc[1]) else '',
-            'contato': row.iloc[2] if pd.notna(row.iloc[2]) else '',
-            'grupo': row.iloc[3] if pd.notna(row.iloc[3]) else ''
-        }
-
-        if codigo:
-            contatos_por_codigo[codigo] = contato_info
-        if nome:
-            contatos_por_nome[nome] = contato_info
+    contadores_similaridade = novos_contadores_similaridade()
 
     progress_callback(0.6)
     log_callback("Comparando registros e criando resultados...")
 
-    # Obter nomes das colunas originais do Excel de Contato
-    col_names = df_contato.columns.tolist()
-
-    # Criar resultado com todos os registros do Excel de Origem
-    resultados = []
-    correspondencias_codigo = 0
-    correspondencias_nome_exato = 0
-    correspondencias_nome_similar = 0
-    sem_correspondencia = 0
-
-    for _, row in df_origem.iterrows():
-        valor_coluna_a = row.iloc[0] if pd.notna(row.iloc[0]) else ''
-        valor_coluna_b = row.iloc[1] if df_origem.shape[1] > 1 and pd.notna(row.iloc[1]) else ''
-
-        # Tentar limpar como código
-        codigo_limpo = limpar_codigo(valor_coluna_a)
-        nome_normalizado_a = normalizar_nome(valor_coluna_a)
-        nome_normalizado_b = normalizar_nome(valor_coluna_b)
-
-        contato_info = None
-
-        # 1. Tentar encontrar por código (coluna A)
-        if codigo_limpo and codigo_limpo in contatos_por_codigo:
-            contato_info = contatos_por_codigo[codigo_limpo]
-            correspondencias_codigo += 1
-
-        # 2. Se não encontrou por código, tentar por nome exato (coluna A)
-        elif nome_normalizado_a and nome_normalizado_a in contatos_por_nome:
-            contato_info = contatos_por_nome[nome_normalizado_a]
-            correspondencias_nome_exato += 1
-
-        # 3. Se não encontrou, tentar por nome exato (coluna B)
-        elif nome_normalizado_b and nome_normalizado_b in contatos_por_nome:
-            contato_info = contatos_por_nome[nome_normalizado_b]
-            correspondencias_nome_exato += 1
-
-        # 4. Se não encontrou exato, tentar por similaridade (coluna A) - 80%
-        if not contato_info and nome_normalizado_a:
-            contato_info, similaridade = buscar_por_similaridade(nome_normalizado_a, contatos_por_nome, 0.8)
-            if contato_info:
-                correspondencias_nome_similar += 1
-                log_callback(f"Similaridade {similaridade:.0%}: '{valor_coluna_a}' -> '{contato_info['nome']}'")
-
-        # 5. Se ainda não encontrou, tentar por similaridade (coluna B) - 80%
-        if not contato_info and nome_normalizado_b:
-            contato_info, similaridade = buscar_por_similaridade(nome_normalizado_b, contatos_por_nome, 0.8)
-            if contato_info:
-                correspondencias_nome_similar += 1
-                log_callback(f"Similaridade {similaridade:.0%}: '{valor_coluna_b}' -> '{contato_info['nome']}'")
-
-        if contato_info:
-            resultados.append({
-                col_names[0]: contato_info['codigo'],
-                col_names[1]: contato_info['nome'],
-                col_names[2]: contato_info['contato'],
-                col_names[3]: contato_info['grupo']
-            })
-        else:
-            # Sem correspondência - mantém dados originais com colunas em branco
-            sem_correspondencia += 1
-            resultados.append({
-                col_names[0]: valor_coluna_a,
-                col_names[1]: valor_coluna_b if valor_coluna_b else valor_coluna_a,
-                col_names[2]: '',
-                col_names[3]: ''
-            })
+    if tamanho_bloco:
+        # Cada bloco da origem é comparado e gravado antes do próximo ser lido
+        total_estimado = estimar_linhas_excel(excel_origem)
+        correspondencias_codigo = correspondencias_nome_exato = correspondencias_nome_similar = 0
+        with abrir_saida(excel_saida, diretorio.colunas[:4], upsert=upsert, log_callback=log_callback) as saida:
+            for numero, bloco in enumerate(ler_excel_em_blocos(excel_origem, COLUNAS_ENTRADA["ALL"], tamanho_bloco), 1):
+                df_bloco, por_codigo, por_nome, por_similaridade = _comparar_all(
+                    bloco, diretorio, contadores_similaridade, log_callback)
+                saida.escrever_dataframe(df_bloco)
+                correspondencias_codigo += por_codigo
+                correspondencias_nome_exato += por_nome
+                correspondencias_nome_similar += por_similaridade
+                log_callback(f"Bloco {numero}: {saida.linhas} registros processados")
+                if total_estimado:
+                    progress_callback(0.6 + 0.35 * min(saida.linhas / total_estimado, 1.0))
+        total = saida.linhas
+        log_callback(f"Registros no Excel de Origem: {total}")
+    else:
+        df_resultado, correspondencias_codigo, correspondencias_nome_exato, correspondencias_nome_similar = _comparar_all(
+            df_origem, diretorio, contadores_similaridade, log_callback)
+        total = len(df_resultado)
+    sem_correspondencia = total - correspondencias_codigo - correspondencias_nome_exato - correspondencias_nome_similar
 
     log_callback(f"Correspondências por código: {correspondencias_codigo}")
     log_callback(f"Correspondências por nome exato: {correspondencias_nome_exato}")
     log_callback(f"Correspondências por similaridade (>=80%): {correspondencias_nome_similar}")
     log_callback(f"Sem correspondência (colunas em branco): {sem_correspondencia}")
+    log_callback(resumo_contadores_similaridade(contadores_similaridade))
 
-    progress_callback(0.8)
-    log_callback("Salvando arquivo Excel de saída...")
-    df_resultado = pd.DataFrame(resultados)
-    df_resultado.to_excel(excel_saida, index=False)
+    if not tamanho_bloco:
+        progress_callback(0.8)
+        log_callback("Salvando arquivo Excel de saída...")
+        salvar_dataframe(df_resultado, excel_saida, upsert=upsert, log_callback=log_callback)
     log_callback(f"Arquivo Excel gerado com sucesso: {excel_saida}")
-    return len(resultados)
+    return total
 
 
 def formatar_cnpj_all_info(cnpj):
@@ -563,6 +2258,49 @@ def formatar_cnpj_all_info(cnpj):
     return cnpj_str
 
 
+def formatar_cnpj_all_info_serie(serie):
+    """
+    Versão vetorizada de formatar_cnpj_all_info: mesmo resultado, elemento a elemento.
+    Floats inteiros são truncados direto com NumPy; textos passam por str.replace/zfill.
+    Só os casos em que o texto pode virar float (ex: '12345678000190.0') ou em que str(float)
+    sai em notação científica usam a função escalar, para manter exatamente a mesma regra.
+    """
+    resultado = pd.Series('', index=serie.index, dtype=object)
+    preenchidos = serie.notna()
+    valores = serie[preenchidos]
+    if valores.empty:
+        return resultado
+
+    if pd.api.types.is_bool_dtype(valores) or not (pd.api.types.is_numeric_dtype(valores)
+                                                    or pd.api.types.is_object_dtype(valores)
+                                                    or pd.api.types.is_string_dtype(valores)):
+        resultado[preenchidos] = valores.map(formatar_cnpj_all_info)
+        return resultado
+
+    if pd.api.types.is_float_dtype(valores):
+        absolutos = valores.abs()
+        # Faixa em que str(float) sai em notação decimal (com '.'), como no caminho escalar
+        decimais = np.isfinite(valores) & (absolutos < 1e16) & ((absolutos >= 1e-4) | (valores == 0))
+        inteiros = np.trunc(valores[decimais]).astype('int64').astype(str).astype(object)
+        resultado[inteiros.index] = inteiros.str.lstrip('-').str.zfill(14)
+        restantes = valores[~decimais]
+        resultado[restantes.index] = restantes.map(formatar_cnpj_all_info)
+        return resultado
+
+    if pd.api.types.is_integer_dtype(valores):
+        textos = valores.astype(str).astype(object)
+        resultado[preenchidos] = textos.str.lstrip('-').str.zfill(14)
+        return resultado
+
+    # object/str: .astype(object) mantém as regex do Python (\d e \s com Unicode), como re.sub
+    textos = valores.astype(str).astype(object)
+    resultado[preenchidos] = textos.str.replace(r'\D', '', regex=True).str.zfill(14)
+    talvez_float = (textos.str.contains('.', regex=False)
+                    & ~textos.str.contains(r'[^\s\d_.eE+\-]', regex=True))
+    resultado[talvez_float[talvez_float].index] = textos[talvez_float].map(formatar_cnpj_all_info)
+    return resultado
+
+
 def obter_competencia_anterior():
     """
     Retorna a competência do mês anterior no formato MM/YYYY.
@@ -577,13 +2315,41 @@ def obter_competencia_anterior():
     return ultimo_dia_mes_anterior.strftime("%m/%Y")
 
 
-def processar_all_info(excel_origem, excel_contato, excel_saida, log_callback, progress_callback):
+def _montar_all_info(df_origem, contatos_por_codigo, colunas_contato, competencia):
+    """
+    Linhas do ALL_info para df_origem (planilha inteira ou um bloco do modo streaming).
+    Retorna (df_resultado com a Competência no final, número de correspondências).
+    """
+    # Reindex pelo código de cada linha da origem (mantém ordem e repetições da origem)
+    valores_a = df_origem.iloc[:, 0].astype(object)
+    valores_a = valores_a.where(valores_a.notna(), '')
+    codigos_limpos = limpar_codigo_serie(valores_a)
+    encontrados = codigos_limpos.isin(contatos_por_codigo.index).to_numpy()
+    df_resultado = contatos_por_codigo.reindex(codigos_limpos.to_numpy()).reset_index(drop=True)
+
+    # Sem correspondência - linha com o código original e colunas vazias
+    if (~encontrados).any():
+        df_resultado.loc[~encontrados, :] = ''
+        df_resultado.loc[~encontrados, colunas_contato[0]] = valores_a.to_numpy()[~encontrados]
+
+    # Competência sempre no final: colunas originais do contato (incluindo CNPJ) + Competência
+    df_resultado['Competência'] = competencia
+    colunas_ordenadas = [col for col in df_resultado.columns if col != 'Competência']
+    colunas_ordenadas.append('Competência')
+    return df_resultado[colunas_ordenadas], int(encontrados.sum())
+
+
+def processar_all_info(excel_origem, excel_contato, excel_saida, log_callback, progress_callback, contatos=None, tamanho_bloco=None, delta=False, caminho_estado=None, upsert=False):
     """
     Modelo ALL_info: Similar ao ALL, mas retorna TODAS as colunas do Excel de Contato.
     Quando encontra correspondência por código, traz todas as informações do contato.
     Inclui formatação de CNPJ para 14 dígitos.
     Adiciona coluna 'Competência' com o mês anterior (para mensagens de notificação).
+    Origens grandes são processadas em blocos (ver tamanho_bloco_streaming).
+    Com delta=True grava só as linhas que mudaram desde a execução anterior (ver SaidaDelta).
     """
+    if delta and upsert:
+        raise ValueError("O modo delta não pode ser combinado com a atualização (upsert) da saída.")
     log_callback("Lendo Excel de Origem...")
     progress_callback(0.2)
 
@@ -591,76 +2357,73 @@ def processar_all_info(excel_origem, excel_contato, excel_saida, log_callback, p
     competencia = obter_competencia_anterior()
     log_callback(f"Competência definida: {competencia} (mês anterior)")
 
-    # Ler Excel de Origem
-    df_origem = pd.read_excel(excel_origem)
-    log_callback(f"Registros no Excel de Origem: {len(df_origem)}")
+    tamanho_bloco = tamanho_bloco_streaming(excel_origem, tamanho_bloco)
+    if tamanho_bloco:
+        log_callback(f"Modo streaming: Excel de Origem lido em blocos de {tamanho_bloco} linhas")
+    else:
+        # Ler Excel de Origem
+        df_origem = ler_excel(excel_origem, COLUNAS_ENTRADA["ALL_info"])
+        log_callback(f"Registros no Excel de Origem: {len(df_origem)}")
 
     progress_callback(0.4)
     log_callback("Lendo Excel de Contato...")
 
-    # Ler Excel de Contato (todas as colunas)
-    df_contato = pd.read_excel(excel_contato)
-    colunas_contato = df_contato.columns.tolist()
-    log_callback(f"Registros no Excel de Contato: {len(df_contato)}")
+    # Excel de Contato (todas as colunas)
+    diretorio = obter_diretorio_contatos(excel_contato, contatos, log_callback)
+    colunas_contato = diretorio.colunas
+    log_callback(f"Registros no Excel de Contato: {len(diretorio)}")
     log_callback(f"Colunas do Excel de Contato: {colunas_contato}")
 
-    # Criar dicionário de contatos indexado por código (coluna A)
-    contatos_por_codigo = {}
-    for _, row in df_contato.iterrows():
-        codigo = limpar_codigo(row.iloc[0])
-        if codigo:
-            # Armazena toda a linha como dicionário
-            contato_info = {}
-            for i, col in enumerate(colunas_contato):
-                valor = row.iloc[i]
-                # Formata CNPJ se a coluna contiver "cnpj" no nome
-                if 'cnpj' in str(col).lower() and pd.notna(valor):
-                    valor = formatar_cnpj_all_info(valor)
-                contato_info[col] = valor if pd.notna(valor) else ''
-            contatos_por_codigo[codigo] = contato_info
+    # Contatos indexados pelo código limpo (coluna A), CNPJ formatado e vazios como ''
+    contatos_por_codigo = diretorio.tabela_por_codigo().copy()
+    for col in colunas_contato:
+        # Formata CNPJ se a coluna contiver "cnpj" no nome
+        if 'cnpj' in str(col).lower():
+            contatos_por_codigo[col] = formatar_cnpj_all_info_serie(contatos_por_codigo[col])
+    contatos_por_codigo = contatos_por_codigo.where(contatos_por_codigo.notna(), '')
 
     progress_callback(0.6)
     log_callback("Comparando códigos e criando resultados...")
 
-    # Criar resultado
-    resultados = []
-    correspondencias = 0
-    sem_correspondencia = 0
-
-    for _, row in df_origem.iterrows():
-        valor_coluna_a = row.iloc[0] if pd.notna(row.iloc[0]) else ''
-        codigo_limpo = limpar_codigo(valor_coluna_a)
-
-        if codigo_limpo and codigo_limpo in contatos_por_codigo:
-            # Encontrou correspondência - usa todas as colunas do contato
-            linha = contatos_por_codigo[codigo_limpo].copy()
-            linha['Competência'] = competencia
-            resultados.append(linha)
-            correspondencias += 1
+    if tamanho_bloco:
+        # Cada bloco da origem é cruzado e gravado antes do próximo ser lido
+        total_estimado = estimar_linhas_excel(excel_origem)
+        colunas_saida = [col for col in colunas_contato if col != 'Competência'] + ['Competência']
+        correspondencias = 0
+        if delta:
+            saida = abrir_saida_delta(excel_saida, colunas_saida, caminho_estado, log_callback)
         else:
-            # Sem correspondência - cria linha com código e colunas vazias
-            linha_vazia = {col: '' for col in colunas_contato}
-            linha_vazia[colunas_contato[0]] = valor_coluna_a  # Mantém o código original
-            linha_vazia['Competência'] = competencia
-            resultados.append(linha_vazia)
-            sem_correspondencia += 1
+            saida = abrir_saida(excel_saida, colunas_saida, upsert=upsert, log_callback=log_callback)
+        with saida:
+            for numero, bloco in enumerate(ler_excel_em_blocos(excel_origem, COLUNAS_ENTRADA["ALL_info"], tamanho_bloco), 1):
+                df_bloco, encontrados_bloco = _montar_all_info(bloco, contatos_por_codigo, colunas_contato, competencia)
+                saida.escrever_dataframe(df_bloco)
+                correspondencias += encontrados_bloco
+                log_callback(f"Bloco {numero}: {saida.linhas} registros processados")
+                if total_estimado:
+                    progress_callback(0.6 + 0.35 * min(saida.linhas / total_estimado, 1.0))
+        total = saida.linhas
+        log_callback(f"Registros no Excel de Origem: {total}")
+    else:
+        df_resultado, correspondencias = _montar_all_info(df_origem, contatos_por_codigo, colunas_contato, competencia)
+        total = len(df_resultado)
+    sem_correspondencia = total - correspondencias
 
     log_callback(f"Correspondências encontradas: {correspondencias}")
     log_callback(f"Sem correspondência: {sem_correspondencia}")
 
-    progress_callback(0.8)
-    log_callback("Salvando arquivo Excel de saída...")
-    df_resultado = pd.DataFrame(resultados)
-
-    # Reordenar colunas para garantir que Competência fique no final
-    # Ordem desejada: colunas originais do contato (incluindo CNPJ) + Competência
-    colunas_ordenadas = [col for col in df_resultado.columns if col != 'Competência']
-    colunas_ordenadas.append('Competência')
-    df_resultado = df_resultado[colunas_ordenadas]
-
-    df_resultado.to_excel(excel_saida, index=False)
+    if not tamanho_bloco:
+        progress_callback(0.8)
+        log_callback("Salvando arquivo Excel de saída...")
+        if delta:
+            with abrir_saida_delta(excel_saida, df_resultado.columns, caminho_estado, log_callback) as saida:
+                saida.escrever_dataframe(df_resultado)
+        else:
+            salvar_dataframe(df_resultado, excel_saida, upsert=upsert, log_callback=log_callback)
+    if delta:
+        log_callback(saida.resumo())
     log_callback(f"Arquivo Excel gerado com sucesso: {excel_saida}")
-    return len(resultados)
+    return total
 
 
 # URL do Google Sheets de Contatos (exportação CSV)
@@ -706,7 +2469,8 @@ def extrair_funcionarios_contrato(caminho_contrato_xls, log_callback=None):
       Linha 'Empresa:' → Col 4: "511 - NEREIDAS IT SERVICES LTDA"
       Linhas de dados  → Col 0: código funcionário, Col 2: nome funcionário
     """
-    df_raw = pd.read_excel(caminho_contrato_xls, header=None, engine='calamine')
+    # Só as colunas 0 e 4 (posições 0 e 1 no DataFrame lido)
+    df_raw = ler_excel(caminho_contrato_xls, COLUNAS_ENTRADA["DomBot_Admiss_contrato"], header=None)
 
     funcionarios_experiencia = set()  # (empresa_nome_norm, cod_funcionario)
     empresa_codigos = {}  # empresa_nome_norm → código
@@ -715,7 +2479,7 @@ def extrair_funcionarios_contrato(caminho_contrato_xls, log_callback=None):
 
     for idx, row in df_raw.iterrows():
         col0 = row.iloc[0] if not pd.isna(row.iloc[0]) else None
-        col4 = row.iloc[4] if len(row) > 4 and not pd.isna(row.iloc[4]) else None
+        col4 = row.iloc[1] if len(row) > 1 and not pd.isna(row.iloc[1]) else None
 
         # Detectar linha "Empresa:" → extrair código e nome
         if col0 is not None and str(col0).strip() == 'Empresa:' and col4 is not None:
@@ -750,7 +2514,54 @@ def extrair_funcionarios_contrato(caminho_contrato_xls, log_callback=None):
     return funcionarios_experiencia, empresa_codigos
 
 
-def processar_dombot_admiss(caminho_xls, caminho_contrato_xls, excel_saida, log_callback, progress_callback, pasta_destino=""):
+class ResolvedorCodigoEmpresa:
+    """
+    Resolve o código da empresa a partir do nome: primeiro busca exata no mapeamento,
+    depois similaridade (>= limite). O resultado fica memorizado por nome normalizado,
+    então cada empresa é resolvida uma única vez, não importa quantos funcionários tenha.
+    """
+
+    def __init__(self, nome_para_codigo, log_callback, limite_similaridade=0.8):
+        self.nome_para_codigo = nome_para_codigo
+        self.log_callback = log_callback
+        self.limite = limite_similaridade
+        self.indice = None  # construído só se algum nome precisar de similaridade
+        self.cache = {}
+        self.acertos = 0
+        self.faltas = 0
+        self.contadores = novos_contadores_similaridade()
+
+    def resolver(self, empresa):
+        """Retorna o código da empresa ou "" quando não há correspondência"""
+        empresa_norm = normalizar_nome(empresa)
+        if empresa_norm in self.cache:
+            self.acertos += 1
+            return self.cache[empresa_norm]
+
+        self.faltas += 1
+        codigo_empresa = self.nome_para_codigo.get(empresa_norm, "")
+
+        # Se não encontrou exato, tentar similaridade (desempate pela ordem do mapeamento)
+        if not codigo_empresa:
+            if self.indice is None:
+                self.indice = IndiceSimilaridade(self.nome_para_codigo, self.limite)
+            melhor_codigo, melhor_sim = self.indice.buscar(empresa_norm, self.contadores)
+            if melhor_codigo is not None:
+                codigo_empresa = melhor_codigo
+                self.log_callback(f"Match por similaridade ({melhor_sim:.0%}): {empresa} -> Código {codigo_empresa}")
+            else:
+                self.log_callback(f"Empresa sem match no Contatos: {empresa}")
+
+        self.cache[empresa_norm] = codigo_empresa
+        return codigo_empresa
+
+    def resumo(self):
+        """Texto para o log com o uso do cache de resolução"""
+        return (f"Resolução de códigos: {len(self.cache)} empresas distintas "
+                f"(cache: {self.acertos} acertos, {self.faltas} faltas)")
+
+
+def processar_dombot_admiss(caminho_xls, caminho_contrato_xls, excel_saida, log_callback, progress_callback, pasta_destino="", upsert=False):
     """
     Modelo DomBot_Admiss: Lê XLS de 'RELAÇÃO DE EMPREGADOS I' (admissões) e
     XLS de 'Contrato por Prazo Determinado' para classificar tipo de contrato.
@@ -776,18 +2587,20 @@ def processar_dombot_admiss(caminho_xls, caminho_contrato_xls, excel_saida, log_
 
     # 3. Ler o XLS de empregados
     log_callback("Lendo arquivo XLS de empregados...")
-    df_raw = pd.read_excel(caminho_xls, header=None, engine='calamine')
+    # Só as colunas 0 e 3 (posições 0 e 1 no DataFrame lido)
+    df_raw = ler_excel(caminho_xls, COLUNAS_ENTRADA["DomBot_Admiss"], header=None)
     total_linhas = len(df_raw)
-    log_callback(f"Arquivo lido: {total_linhas} linhas, {len(df_raw.columns)} colunas")
+    log_callback(f"Arquivo lido: {total_linhas} linhas, {len(df_raw.columns)} colunas utilizadas")
 
     progress_callback(0.4)
 
     dados = []
     empresa_atual = None
+    resolvedor = ResolvedorCodigoEmpresa(nome_para_codigo, log_callback)
 
     for idx, row in df_raw.iterrows():
         col0 = row.iloc[0] if not pd.isna(row.iloc[0]) else None
-        col3 = row.iloc[3] if len(row) > 3 and not pd.isna(row.iloc[3]) else None
+        col3 = row.iloc[1] if len(row) > 1 and not pd.isna(row.iloc[1]) else None
 
         # Detectar linha de empresa: col0 tem texto (não numérico) e col3 é vazio
         if col0 is not None and col3 is None:
@@ -818,24 +2631,9 @@ def processar_dombot_admiss(caminho_xls, caminho_contrato_xls, excel_saida, log_
             if not nome_func or nome_func.lower() in ['nome', 'nan']:
                 continue
 
-            # Cruzar empresa com contatos para obter código
+            # Cruzar empresa com contatos para obter código (resolvido uma vez por empresa)
             empresa_norm = normalizar_nome(empresa_atual)
-            codigo_empresa = nome_para_codigo.get(empresa_norm, "")
-
-            # Se não encontrou exato, tentar similaridade
-            if not codigo_empresa:
-                melhor_sim = 0
-                melhor_codigo = ""
-                for nome_contato, cod in nome_para_codigo.items():
-                    sim = calcular_similaridade(empresa_norm, nome_contato)
-                    if sim > melhor_sim:
-                        melhor_sim = sim
-                        melhor_codigo = cod
-                if melhor_sim >= 0.8:
-                    codigo_empresa = melhor_codigo
-                    log_callback(f"Match por similaridade ({melhor_sim:.0%}): {empresa_atual} -> Código {codigo_empresa}")
-                else:
-                    log_callback(f"Empresa sem match no Contatos: {empresa_atual}")
+            codigo_empresa = resolvedor.resolver(empresa_atual)
 
             # Determinar tipo de contrato (E = Experiência, I = Indeterminado)
             tipo_contrato = "E" if (empresa_norm, cod_func) in funcionarios_exp else "I"
@@ -858,6 +2656,8 @@ def processar_dombot_admiss(caminho_xls, caminho_contrato_xls, excel_saida, log_
             progress_callback(progresso)
 
     log_callback(f"Total de registros extraídos: {len(dados)}")
+    log_callback(resolvedor.resumo())
+    log_callback(resumo_contadores_similaridade(resolvedor.contadores))
 
     if not dados:
         raise ValueError("Nenhum dado encontrado no arquivo. Verifique o formato.")
@@ -865,20 +2665,51 @@ def processar_dombot_admiss(caminho_xls, caminho_contrato_xls, excel_saida, log_
     progress_callback(0.9)
     log_callback("Montando e salvando planilha de saída...")
 
-    df = pd.DataFrame(dados)
-    df.to_excel(excel_saida, index=False)
+    colunas = ['Nº', 'EMPRESAS', 'Cod.Funcionário', 'Funcionário', 'Tipo de Contrato', 'Documento']
+    # Upsert pela empresa + funcionário (o nome da empresa separa as empresas sem Nº encontrado)
+    salvar_linhas(dados, colunas, excel_saida, upsert=['Nº', 'EMPRESAS', 'Cod.Funcionário'] if upsert else None,
+                  log_callback=log_callback)
     log_callback(f"Arquivo Excel gerado com sucesso: {excel_saida}")
     progress_callback(1.0)
     return len(dados)
 
 
-def processar_dombot_econsig(caminho_pdf, excel_saida, log_callback, progress_callback, data_inicial="", data_final="", pasta_destino=""):
+# Regex para capturar: Empresa: 123 - NOME DA EMPRESA LTDA - ME
+REGEX_EMPRESA_ECONSIG = re.compile(r'Empresa:\s*(\d+)\s*[-–]\s*(.+)')
+# Regex para limpar sufixo "Página: X/Y" que o PDF junta ao nome da empresa
+REGEX_LIMPEZA_NOME_ECONSIG = re.compile(r'\s*P[áa]gina\s*:\s*\d+/\d+.*$', re.IGNORECASE)
+
+
+def _empresas_econsig_texto(texto):
+    """(código, nome) de cada linha 'Empresa:' do texto de uma página, na ordem do texto"""
+    encontradas = []
+    if texto:
+        for match in REGEX_EMPRESA_ECONSIG.finditer(texto):
+            codigo = limpar_codigo(match.group(1))
+            nome = REGEX_LIMPEZA_NOME_ECONSIG.sub('', match.group(2)).strip()
+            if codigo and nome:
+                encontradas.append((codigo, nome))
+    return encontradas
+
+
+def extrair_empresas_econsig(caminho_pdf, progress_callback=None, trabalhadores=None, log_callback=None):
+    """
+    Lista (código, nome) de todas as páginas, na ordem do PDF. O texto vem de extrair_textos_pdf
+    (cache de texto ou leitura em paralelo), então o resultado é o mesmo da leitura sequencial.
+    progress_callback recebe a fração de páginas lidas (0 a 1).
+    """
+    textos = extrair_textos_pdf(caminho_pdf, progress_callback, log_callback, trabalhadores)
+    return [empresa for texto in textos for empresa in _empresas_econsig_texto(texto)]
+
+
+def processar_dombot_econsig(caminho_pdf, excel_saida, log_callback, progress_callback, data_inicial="", data_final="", pasta_destino="", upsert=False, trabalhadores=None):
     """
     Modelo DomBot_Econsig: Lê PDF de 'RELAÇÃO DE EMPRÉSTIMOS CONSIGNADOS'.
     Extrai linhas 'Empresa: CÓDIGO - NOME DA EMPRESA' de cada página.
     Gera Excel com: Nº, EMPRESAS, Data Inicial, Data Final, Salvar Como.
     As datas podem ser extraídas automaticamente do cabeçalho do PDF (DD/MM/AAAA - DD/MM/AAAA)
     ou informadas manualmente pelo usuário.
+    As páginas são lidas em paralelo (ver extrair_empresas_econsig e TRABALHADORES_PDF).
     """
     log_callback("Lendo arquivo PDF...")
     progress_callback(0.2)
@@ -887,31 +2718,16 @@ def processar_dombot_econsig(caminho_pdf, excel_saida, log_callback, progress_ca
     if not data_inicial or not data_final:
         raise ValueError("Data Inicial e Data Final são obrigatórias.")
 
-    # Regex para capturar: Empresa: 123 - NOME DA EMPRESA LTDA - ME
-    regex_empresa = re.compile(r'Empresa:\s*(\d+)\s*[-–]\s*(.+)')
-    # Regex para limpar sufixo "Página: X/Y" que o PDF junta ao nome da empresa
-    regex_limpeza_nome = re.compile(r'\s*P[áa]gina\s*:\s*\d+/\d+.*$', re.IGNORECASE)
-
+    # Progresso proporcional às páginas lidas (de 0.2 a 0.7)
+    empresas = extrair_empresas_econsig(caminho_pdf, lambda fracao: progress_callback(0.2 + 0.5 * fracao),
+                                        trabalhadores, log_callback)
     dados_empresas = []
-
-    with pdfplumber.open(caminho_pdf) as pdf:
-        total_paginas = len(pdf.pages)
-        for i, pagina in enumerate(pdf.pages):
-            texto = pagina.extract_text()
-            if texto:
-                for match in regex_empresa.finditer(texto):
-                    codigo = limpar_codigo(match.group(1))
-                    nome = regex_limpeza_nome.sub('', match.group(2)).strip()
-                    if codigo and nome:
-                        dados_empresas.append({
-                            'codigo': codigo,
-                            'empresa': nome
-                        })
-                        log_callback(f"Empresa encontrada: {codigo} - {nome}")
-
-            # Atualizar progresso proporcional às páginas
-            progresso = 0.2 + (0.5 * (i + 1) / total_paginas)
-            progress_callback(progresso)
+    for codigo, nome in empresas:
+        dados_empresas.append({
+            'codigo': codigo,
+            'empresa': nome
+        })
+        log_callback(f"Empresa encontrada: {codigo} - {nome}")
 
     log_callback(f"Total de empresas extraídas do PDF: {len(dados_empresas)}")
 
@@ -938,42 +2754,34 @@ def processar_dombot_econsig(caminho_pdf, excel_saida, log_callback, progress_ca
     except (IndexError, AttributeError):
         competencia = ""
 
-    # Montar DataFrame com as colunas finais
-    resultados = []
-    for d in dados_unicos:
-        nome_arquivo = f"{d['codigo']}-{d['empresa']}-{competencia}"
-        salvar_como = os.path.join(pasta_destino, nome_arquivo) if pasta_destino else nome_arquivo
-        resultados.append({
-            'Nº': d['codigo'],
-            'EMPRESAS': d['empresa'],
-            'Data Inicial': data_inicial,
-            'Data Final': data_final,
-            'Salvar Como': salvar_como
-        })
-
-    df = pd.DataFrame(resultados)
-
     progress_callback(0.9)
     log_callback("Salvando arquivo Excel de saída...")
-    df.to_excel(excel_saida, index=False)
+
+    # Gravar as linhas finais direto na saída
+    with abrir_saida(excel_saida, ['Nº', 'EMPRESAS', 'Data Inicial', 'Data Final', 'Salvar Como'],
+                     upsert=upsert, log_callback=log_callback) as saida:
+        for d in dados_unicos:
+            nome_arquivo = f"{d['codigo']}-{d['empresa']}-{competencia}"
+            salvar_como = os.path.join(pasta_destino, nome_arquivo) if pasta_destino else nome_arquivo
+            saida.escrever((d['codigo'], d['empresa'], data_inicial, data_final, salvar_como))
     log_callback(f"Arquivo Excel gerado com sucesso: {excel_saida}")
-    return len(resultados)
+    return saida.linhas
 
 
-def processar_dombot(excel_base, excel_entrada, excel_saida, log_callback, progress_callback, periodo="", pasta_destino=""):
+def processar_dombot(excel_base, excel_entrada, excel_saida, log_callback, progress_callback, periodo="", pasta_destino="", upsert=False):
     # Nota: Este modelo não usa excel_entrada (Contatos Onvio), pois não utiliza contatos ou grupos
     log_callback("Lendo Excel Base...")
     progress_callback(0.2)
 
     # Ler o Excel base, sheet específica
-    df = pd.read_excel(excel_base)
+    df = ler_excel(excel_base, COLUNAS_ENTRADA["DomBot_GMS"])
 
     # Renomear colunas para padronização (usar só as 3 primeiras)
     df = df.iloc[:, :3]
     df.columns = ['Nº', 'EMPRESAS', 'Tarefa']
 
     # Converter 'Nº' para string e limpar
-    df['Nº'] = df['Nº'].apply(limpar_codigo)
+    df['Nº'] = limpar_codigo_serie(df['Nº'])
 
     # Remover duplicatas baseadas em 'Nº' e 'EMPRESAS'
     df = df.drop_duplicates(subset=['Nº', 'EMPRESAS'])
@@ -1018,7 +2826,7 @@ def processar_dombot(excel_base, excel_entrada, excel_saida, log_callback, progr
     
     progress_callback(0.8)
     log_callback("Salvando arquivo Excel de saída...")
-    df.to_excel(excel_saida, index=False)
+    salvar_dataframe(df, excel_saida, upsert=upsert, log_callback=log_callback)
     log_callback(f"Arquivo Excel gerado com sucesso: {excel_saida}")
     return len(df)
 
@@ -1058,6 +2866,8 @@ class ExcelGeneratorApp:
         self.excel_saida = ""
         self.modelo = ""
         self.pasta_destino_dombot = ""
+        # Excel de Contatos já lidos, reaproveitados entre execuções enquanto o arquivo não mudar
+        self.diretorios_contatos = {}
         
         self.setup_ui()
       
@@ -1177,6 +2987,14 @@ class ExcelGeneratorApp:
             height=24,
             command=self.clear_log
         ).pack(side="right")
+
+        ctk.CTkButton(
+            log_header,
+            text="Limpar cache",
+            width=90,
+            height=24,
+            command=self.clear_cache
+        ).pack(side="right", padx=(0, 5))
         
         # Área de log
         self.log_text = ctk.CTkTextbox(
@@ -1411,6 +3229,29 @@ class ExcelGeneratorApp:
             "Definir", 
             self.select_output_excel
         )
+
+        # Upsert: atualiza o arquivo de saída existente (por código) em vez de recriá-lo
+        self.upsert_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(
+            self.inputs_frame,
+            text="Atualizar saída existente (substitui/adiciona por código)",
+            variable=self.upsert_var,
+            font=ctk.CTkFont(size=10),
+            checkbox_width=18,
+            checkbox_height=18
+        ).pack(anchor="w", pady=2)
+
+        if choice in ["ALL_info", "ComuniCertificado"]:
+            # Modo delta: grava só as linhas novas, alteradas ou removidas desde a última execução
+            self.delta_var = ctk.BooleanVar(value=False)
+            ctk.CTkCheckBox(
+                self.inputs_frame,
+                text="Só alterações desde a última execução (delta)",
+                variable=self.delta_var,
+                font=ctk.CTkFont(size=10),
+                checkbox_width=18,
+                checkbox_height=18
+            ).pack(anchor="w", pady=2)
         
         self.status_label.configure(text="✅ Pronto para processar")
         self.log_message(f"Modelo selecionado: {choice}")
@@ -1420,6 +3261,12 @@ class ExcelGeneratorApp:
         self.log_text.delete("1.0", "end")
         self.log_message("Log limpo")
     
+    def clear_cache(self):
+        """Apaga o cache local (snapshots de planilhas) e descarta os contatos em memória"""
+        arquivos, total = limpar_cache()
+        self.diretorios_contatos.clear()
+        self.log_message(f"🧹 Cache limpo: {arquivos} arquivos, {total / (1024 * 1024):.1f} MB liberados")
+    
     def select_pdf_folder(self):
         folder = filedialog.askdirectory(title="Selecionar pasta com arquivos PDF")
         if folder:
@@ -1465,7 +3312,8 @@ class ExcelGeneratorApp:
         file = filedialog.asksaveasfilename(
             title="Definir arquivo Excel de saída",
             defaultextension=".xlsx",
-            filetypes=[("Excel files", "*.xlsx")]
+            filetypes=[("Excel files", "*.xlsx"), ("CSV (UTF-8)", "*.csv"),
+                       ("Parquet", "*.parquet"), ("JSON Lines", "*.jsonl")]
         )
         if file:
             self.excel_saida = file
@@ -1563,6 +3411,17 @@ class ExcelGeneratorApp:
 
         return True
     
+    def obter_diretorio_contatos(self, caminho):
+        """Retorna o Excel de Contatos já carregado, relendo só se o arquivo mudou (data ou tamanho)"""
+        diretorio = self.diretorios_contatos.get(caminho)
+        if diretorio is not None and not diretorio.desatualizado():
+            self.log_message(f"📋 Reutilizando contatos já carregados: {os.path.basename(caminho)}")
+            return diretorio
+        self.log_message(f"📋 Carregando contatos: {os.path.basename(caminho)}")
+        diretorio = ContactDirectory(caminho, self.log_message)
+        self.diretorios_contatos[caminho] = diretorio
+        return diretorio
+
     def process_files(self):
         """Inicia o processamento em thread separada"""
         if not self.validate_inputs():
@@ -1585,6 +3444,7 @@ class ExcelGeneratorApp:
                 raise ValueError(f"Modelo {self.modelo} não encontrado.")
             
             input_file = self.pasta_pdf if self.modelo in ["ONE", "Cobranca", "DomBot_Econsig"] else self.excel_base
+            opcoes = {'upsert': self.upsert_var.get() if hasattr(self, 'upsert_var') else False}
             if self.modelo == "DomBot_Admiss":
                 pasta_docs = self.pasta_docs_admiss if hasattr(self, 'pasta_docs_admiss') else ""
                 total_registros = processador(
@@ -1593,7 +3453,8 @@ class ExcelGeneratorApp:
                     self.excel_saida,
                     self.log_message,
                     self.progress_bar.set,
-                    pasta_destino=pasta_docs
+                    pasta_destino=pasta_docs,
+                    **opcoes
                 )
             elif self.modelo == "DomBot_Econsig":
                 data_inicial = self.data_inicial_entry.get().strip() if hasattr(self, 'data_inicial_entry') else ""
@@ -1606,7 +3467,8 @@ class ExcelGeneratorApp:
                     self.progress_bar.set,
                     data_inicial=data_inicial,
                     data_final=data_final,
-                    pasta_destino=pasta_docs
+                    pasta_destino=pasta_docs,
+                    **opcoes
                 )
             elif self.modelo == "DomBot_GMS":
                 periodo = self.periodo_entry.get().strip() if hasattr(self, 'periodo_entry') else ""
@@ -1618,15 +3480,20 @@ class ExcelGeneratorApp:
                     self.log_message,
                     self.progress_bar.set,
                     periodo=periodo,
-                    pasta_destino=pasta_destino
+                    pasta_destino=pasta_destino,
+                    **opcoes
                 )
             else:
+                if self.modelo in ["ALL_info", "ComuniCertificado"] and hasattr(self, 'delta_var'):
+                    opcoes['delta'] = self.delta_var.get()
                 total_registros = processador(
                     input_file, 
                     self.excel_entrada, 
                     self.excel_saida, 
                     self.log_message, 
-                    self.progress_bar.set
+                    self.progress_bar.set,
+                    contatos=self.obter_diretorio_contatos(self.excel_entrada),
+                    **opcoes
                 )
             
             self.progress_bar.set(1.0)
@@ -1649,6 +3516,12 @@ class ExcelGeneratorApp:
             self.process_button.configure(state="normal")
 
 def main():
+    # Uso via linha de comando: python M.E.G_ONE.py --limpar-cache
+    if '--limpar-cache' in sys.argv[1:]:
+        arquivos, total = limpar_cache()
+        print(f"Cache limpo: {arquivos} arquivos, {total / (1024 * 1024):.1f} MB liberados")
+        return
+
     root = ctk.CTk()
     
      # Adiciona ícone se estiver disponível
@@ -1669,4 +3542,6 @@ def main():
     root.mainloop()
 
 if __name__ == "__main__":
+    # Necessário para os processos de leitura de PDF no executável (PyInstaller) do Windows
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""
+Benchmark da leitura do Excel de contatos (50 mil linhas, 6 colunas, sintético):
+  original   openpyxl.load_workbook completo, como o carregar_contatos_excel original
+  diretorio  ContactDirectory(...).contatos_por_codigo(), sem snapshot no cache (primeira leitura)
+  diretorio_openpyxl  o mesmo, com a engine padrão do pandas (sem python-calamine)
+  streaming  carregar_contatos_excel (iterar_contatos_excel, openpyxl read_only)
+  filtrado   carregar_contatos_excel com `codigos` (500 códigos, como no ComuniCertificado)
+Cada medição roda em um processo novo; a memória é o pico do processo (ru_maxrss) menos o pico
+logo antes da leitura. Todas as variantes devolvem o mesmo dicionário para os códigos pedidos.
+
+Uso: python benchmarks/bench_contatos.py [--linhas N] [--filtro N]
+"""
+import argparse
+import importlib.util
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VARIANTES = ["original", "diretorio", "diretorio_openpyxl", "streaming", "filtrado"]
+
+
+def carregar_meg():
+    spec = importlib.util.spec_from_file_location("meg_one", os.path.join(RAIZ, "M.E.G_ONE.py"))
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def pico_memoria_mb():
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def gerar_contatos(caminho, total):
+    import openpyxl
+    gerador = random.Random(1)
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(["Código", "Empresa", "Contato Onvio", "Grupo Onvio", "CNPJ", "Telefone"])
+    for i in range(1, total + 1):
+        ws.append([i if gerador.random() > 0.01 else None, f"EMPRESA {i} LTDA", f"contato{i}@empresa.com",
+                   f"GRUPO {gerador.randint(1, 80)}", f"{gerador.randrange(10**13, 10**14)}",
+                   f"(11) 9{gerador.randrange(10**7, 10**8)}"])
+    wb.save(caminho)
+
+
+def carregar_original(meg, caminho):
+    """carregar_contatos_excel antes da mudança: load_workbook completo, sem fechar o arquivo"""
+    import openpyxl
+    sheet = openpyxl.load_workbook(caminho).active
+    contatos = {}
+    for row in sheet.iter_rows(min_row=2, values_only=True):
+        codigo, nome, nome_contato, nome_grupo = row[:4]
+        codigo_limpo = meg.limpar_codigo(codigo)
+        if codigo_limpo:
+            contatos[codigo_limpo] = {'empresa': nome, 'contato': nome_contato, 'grupo': nome_grupo}
+    return contatos
+
+
+def medir(variante, caminho, codigos):
+    meg = carregar_meg()
+    antes = pico_memoria_mb()
+    inicio = time.perf_counter()
+    if variante == "original":
+        contatos = carregar_original(meg, caminho)
+    elif variante.startswith("diretorio"):
+        if variante == "diretorio_openpyxl":
+            meg.ENGINE_LEITURA_EXCEL = None
+        contatos = meg.ContactDirectory(caminho).contatos_por_codigo()
+    elif variante == "streaming":
+        contatos = meg.carregar_contatos_excel(caminho)
+    else:
+        contatos = meg.carregar_contatos_excel(caminho, set(codigos))
+    tempo = time.perf_counter() - inicio
+    pedidos = {codigo: contatos.get(codigo) for codigo in codigos}
+    print(json.dumps({"tempo": tempo, "memoria": pico_memoria_mb() - antes, "registros": len(contatos),
+                      "pedidos": pedidos}, default=str))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=50000)
+    parser.add_argument("--filtro", type=int, default=500)
+    parser.add_argument("--medir", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.medir:
+        variante, caminho, codigos = args.medir
+        medir(variante, caminho, json.loads(codigos))
+        return
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "contatos.xlsx")
+        gerar_contatos(caminho, args.linhas)
+        codigos = [str(codigo) for codigo in random.Random(2).sample(range(1, args.linhas + 1), args.filtro)]
+        ambiente = dict(os.environ, LOCALAPPDATA=os.path.join(pasta, "cache"))
+        print(f"contatos={args.linhas}  filtro={args.filtro} códigos")
+        referencia = None
+        for variante in VARIANTES:
+            # Cache vazio a cada medição: o ContactDirectory não reaproveita o snapshot da anterior
+            ambiente["LOCALAPPDATA"] = os.path.join(pasta, f"cache_{variante}")
+            saida = subprocess.run([sys.executable, os.path.abspath(__file__), "--medir", variante, caminho,
+                                    json.dumps(codigos)], env=ambiente, capture_output=True, text=True, check=True)
+            resultado = json.loads(saida.stdout.strip().splitlines()[-1])
+            if referencia is None:
+                referencia = resultado["pedidos"]
+            elif resultado["pedidos"] != referencia:
+                raise AssertionError(f"{variante}: contatos diferentes da leitura original")
+            print(f"{variante:>18}: {resultado['tempo']:6.2f}s  pico +{resultado['memoria']:6.1f} MB  "
+                  f"({resultado['registros']} registros)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark de escala do modelo ONE: de 100 a 100 mil PDFs contra um Excel de contatos sintético.
+Compara o cruzamento original (busca do código e máscara booleana no DataFrame a cada PDF) com o
+processar_one atual (left join pelo código). Os PDFs são arquivos vazios: o ONE só lê os nomes.
+A versão original fica de fora acima de --limite-original PDFs (ela é O(PDFs x contatos)).
+
+Uso: python benchmarks/bench_one.py [pdfs ...] [--contatos N] [--limite-original N]
+"""
+import argparse
+import importlib.util
+import os
+import random
+import re
+import tempfile
+import time
+
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def carregar_meg():
+    spec = importlib.util.spec_from_file_location("meg_one", os.path.join(RAIZ, "M.E.G_ONE.py"))
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def sem_log(*args):
+    pass
+
+
+def cruzamento_original(pasta_pdf, df_excel):
+    """Laço do processar_one original, sem a leitura do Excel e sem a gravação da saída"""
+    codigos_empresas = []
+    for arquivo in os.listdir(pasta_pdf):
+        if arquivo.lower().endswith('.pdf'):
+            match = re.match(r'^(\d+)\s*-', arquivo)
+            if match:
+                codigos_empresas.append((match.group(1), arquivo))
+    resultados = []
+    for codigo, arquivo_pdf in codigos_empresas:
+        resultado = {'Código': codigo, 'Empresa': '', 'Contato Onvio': '', 'Grupo Onvio': '',
+                     'Caminho': os.path.join(pasta_pdf, arquivo_pdf)}
+        if codigo in df_excel.iloc[:, 0].values:
+            linha = df_excel[df_excel.iloc[:, 0] == codigo].iloc[0]
+            resultado.update({'Empresa': linha.iloc[1], 'Contato Onvio': linha.iloc[2], 'Grupo Onvio': linha.iloc[3]})
+        resultados.append(resultado)
+    return pd.DataFrame(resultados)
+
+
+def gerar_contatos(caminho, total, gerador):
+    df = pd.DataFrame({
+        'Código': range(1, total + 1),
+        'Empresa': [f"EMPRESA {i}" for i in range(1, total + 1)],
+        'Contato Onvio': [f"contato{i}@empresa.com" for i in range(1, total + 1)],
+        'Grupo Onvio': [f"GRUPO {gerador.randint(1, 50)}" for _ in range(total)],
+    })
+    df.to_excel(caminho, index=False)
+
+
+def gerar_pdfs(pasta, total, total_contatos, gerador):
+    """80% dos PDFs com código existente nos contatos, o resto com código desconhecido"""
+    os.makedirs(pasta)
+    for i in range(total):
+        codigo = gerador.randint(1, total_contatos) if gerador.random() < 0.8 else total_contatos + 1 + i
+        open(os.path.join(pasta, f"{codigo} - relatorio {i}.pdf"), 'w').close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="*", type=int, default=[100, 1000, 10000, 100000])
+    parser.add_argument("--contatos", type=int, default=10000)
+    parser.add_argument("--limite-original", type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        os.environ['LOCALAPPDATA'] = os.path.join(pasta, 'cache')  # cache do programa isolado
+        meg = carregar_meg()
+        gerador = random.Random(1)
+        excel_contatos = os.path.join(pasta, 'contatos.xlsx')
+        gerar_contatos(excel_contatos, args.contatos, gerador)
+        # Contatos lidos uma vez, fora da medição, nas duas versões
+        diretorio = meg.ContactDirectory(excel_contatos)
+        df_excel = pd.read_excel(excel_contatos)
+        df_excel[df_excel.columns[0]] = df_excel.iloc[:, 0].astype(str)
+
+        print(f"contatos={args.contatos}")
+        for total in args.pdfs:
+            pasta_pdf = os.path.join(pasta, f"pdfs_{total}")
+            gerar_pdfs(pasta_pdf, total, args.contatos, gerador)
+            tempo_original = None
+            if total <= args.limite_original:
+                inicio = time.perf_counter()
+                cruzamento_original(pasta_pdf, df_excel)
+                tempo_original = time.perf_counter() - inicio
+            # Saída em CSV: o tempo medido é o do cruzamento, não o da gravação do .xlsx
+            saida = os.path.join(pasta, f"saida_{total}.csv")
+            inicio = time.perf_counter()
+            meg.processar_one(pasta_pdf, excel_contatos, saida, sem_log, sem_log, contatos=diretorio)
+            tempo_atual = time.perf_counter() - inicio
+            original = f"{tempo_original:8.3f}s" if tempo_original is not None else f"{'(pulado)':>9}"
+            ganho = f"{tempo_original / tempo_atual:7.1f}x" if tempo_original is not None else ""
+            print(f"PDFs={total:>7}  original={original}  join={tempo_atual:7.3f}s  {ganho}")
+
+
+if __name__ == "__main__":
+    main()
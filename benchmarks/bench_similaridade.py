@@ -0,0 +1,103 @@
+"""
+Benchmark da busca por similaridade de nomes (modelos ALL e DomBot_Admiss):
+varredura linear com ratio() contra todos os contatos (implementação original) x IndiceSimilaridade.
+Os dados são sintéticos; o script confere que os dois retornam o mesmo contato e a mesma similaridade.
+
+Uso: python benchmarks/bench_similaridade.py [contatos ...] [--consultas N] [--limite 0.8]
+"""
+import argparse
+import importlib.util
+import os
+import random
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PALAVRAS = ["comercio", "industria", "servicos", "ltda", "me", "eireli", "transportes", "alimentos", "sao",
+            "paulo", "santos", "silva", "contabil", "tecnologia", "brasil", "nordeste", "distribuidora",
+            "construtora", "materiais", "auto", "pecas", "farmacia", "padaria", "mercado", "oliveira", "souza"]
+
+
+def carregar_meg():
+    spec = importlib.util.spec_from_file_location("meg_one", os.path.join(RAIZ, "M.E.G_ONE.py"))
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def nome_aleatorio(gerador):
+    return " ".join(gerador.choice(PALAVRAS) for _ in range(gerador.randint(2, 5)))
+
+
+def variacao(gerador, nome):
+    """Nome com até 3 erros de digitação (troca, remoção ou inserção de letra)"""
+    letras = list(nome)
+    for _ in range(gerador.randint(0, 3)):
+        posicao = gerador.randrange(len(letras))
+        operacao = gerador.random()
+        if operacao < 0.33:
+            letras[posicao] = gerador.choice("abcdefghijklmnopqrstuvwxyz ")
+        elif operacao < 0.66 and len(letras) > 1:
+            del letras[posicao]
+        else:
+            letras.insert(posicao, gerador.choice("abcdefghijklmnopqrstuvwxyz"))
+    return "".join(letras)
+
+
+def varredura_linear(meg, nome_busca, contatos_por_nome, limite):
+    """buscar_por_similaridade original: SequenceMatcher completo contra cada contato"""
+    if not nome_busca:
+        return None, 0.0
+    melhor_match, melhor_similaridade = None, 0.0
+    for nome_contato, contato_info in contatos_por_nome.items():
+        similaridade = meg.calcular_similaridade(nome_busca, nome_contato)
+        if similaridade >= limite and similaridade > melhor_similaridade:
+            melhor_similaridade, melhor_match = similaridade, contato_info
+    return melhor_match, melhor_similaridade
+
+
+def medir(meg, total_contatos, total_consultas, limite, semente=1):
+    gerador = random.Random(semente)
+    contatos_por_nome = {}
+    while len(contatos_por_nome) < total_contatos:
+        contatos_por_nome.setdefault(f"{nome_aleatorio(gerador)} {gerador.randint(1, 99)}", len(contatos_por_nome))
+    nomes = list(contatos_por_nome)
+    # 60% das consultas são variações de um contato existente, o resto nomes quaisquer
+    consultas = [variacao(gerador, gerador.choice(nomes)) if gerador.random() < 0.6 else nome_aleatorio(gerador)
+                 for _ in range(total_consultas)]
+
+    inicio = time.perf_counter()
+    esperado = [varredura_linear(meg, consulta, contatos_por_nome, limite) for consulta in consultas]
+    tempo_linear = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    indice = meg.IndiceSimilaridade(contatos_por_nome, limite)
+    tempo_indice_montagem = time.perf_counter() - inicio
+
+    contadores = meg.novos_contadores_similaridade()
+    inicio = time.perf_counter()
+    resultado = [indice.buscar(consulta, contadores) for consulta in consultas]
+    tempo_indice_busca = time.perf_counter() - inicio
+
+    if resultado != esperado:
+        raise AssertionError("IndiceSimilaridade retornou resultado diferente da varredura linear")
+    encontrados = sum(1 for contato, _ in esperado if contato is not None)
+    print(f"contatos={total_contatos:>6}  consultas={total_consultas}  encontrados={encontrados:>4}  "
+          f"linear={tempo_linear:7.2f}s  índice: montagem={tempo_indice_montagem:5.2f}s "
+          f"busca={tempo_indice_busca:6.2f}s  ganho={tempo_linear / max(tempo_indice_busca, 1e-9):6.1f}x")
+    print(f"    {meg.resumo_contadores_similaridade(contadores)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("contatos", nargs="*", type=int, default=[1000, 5000])
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--limite", type=float, default=0.8)
+    args = parser.parse_args()
+    meg = carregar_meg()
+    for total_contatos in args.contatos:
+        medir(meg, total_contatos, args.consultas, args.limite)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="session")
+def meg(tmp_path_factory):
+    """Módulo M.E.G_ONE.py (o nome do arquivo não é importável com import normal)"""
+    # Cache local do programa isolado numa pasta temporária
+    os.environ['LOCALAPPDATA'] = str(tmp_path_factory.mktemp("cache"))
+    spec = importlib.util.spec_from_file_location("meg_one", os.path.join(RAIZ, "M.E.G_ONE.py"))
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules["meg_one"] = modulo
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def _escrever_pdf(caminho, paginas):
+    """PDF mínimo (Helvetica), uma página por item de `paginas` (lista de linhas de texto)"""
+    objetos = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    filhos = []
+    for linhas in paginas:
+        comandos = ["BT", "/F1 11 Tf", "14 TL", "50 780 Td"]
+        for linha in linhas:
+            texto = linha.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            comandos.append(f"({texto}) Tj T*")
+        comandos.append("ET")
+        conteudo = "\n".join(comandos).encode("latin-1")
+        objetos.append(f"<< /Length {len(conteudo)} >>\nstream\n".encode("latin-1") + conteudo + b"\nendstream")
+        objetos.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents {len(objetos)} 0 R "
+                       f"/Resources << /Font << /F1 3 0 R >> >> >>")
+        filhos.append(f"{len(objetos)} 0 R")
+    objetos[1] = f"<< /Type /Pages /Kids [{' '.join(filhos)}] /Count {len(filhos)} >>"
+
+    dados = bytearray(b"%PDF-1.4\n")
+    posicoes = []
+    for numero, objeto in enumerate(objetos, 1):
+        posicoes.append(len(dados))
+        corpo = objeto if isinstance(objeto, bytes) else objeto.encode("latin-1")
+        dados += f"{numero} 0 obj\n".encode() + corpo + b"\nendobj\n"
+    inicio_xref = len(dados)
+    dados += f"xref\n0 {len(objetos) + 1}\n0000000000 65535 f \n".encode()
+    dados += b"".join(f"{posicao:010d} 00000 n \n".encode() for posicao in posicoes)
+    dados += f"trailer\n<< /Size {len(objetos) + 1} /Root 1 0 R >>\nstartxref\n{inicio_xref}\n%%EOF\n".encode()
+    with open(caminho, "wb") as f:
+        f.write(bytes(dados))
+
+
+@pytest.fixture
+def gerar_pdf():
+    """Função gerar_pdf(caminho, paginas) que grava um PDF de teste com o texto de cada página"""
+    return _escrever_pdf
@@ -0,0 +1,129 @@
+import os
+
+import openpyxl
+import pandas as pd
+
+
+def _pasta(tmp_path):
+    pasta = tmp_path / "cache"
+    pasta.mkdir()
+    return str(pasta)
+
+
+def _paginas(prefixo, total=3):
+    return [[f"{prefixo} pagina {i}", f"Codigo {i:04d}"] for i in range(1, total + 1)]
+
+
+def _nao_abrir(*args, **kwargs):
+    raise AssertionError("o PDF não deveria ser aberto")
+
+
+def test_texto_pdf_salvo_e_reaproveitado(meg, tmp_path, gerar_pdf):
+    caminho = tmp_path / "doc.pdf"
+    gerar_pdf(caminho, _paginas("salvo"))
+    cache = meg.CacheTextoPdf(_pasta(tmp_path))
+    assert cache.carregar(str(caminho)) is None
+    cache.salvar(str(caminho), ["a", None, "c"])
+    assert cache.carregar(str(caminho)) == ["a", None, "c"]
+    # Endereçado pelo conteúdo: uma cópia em outro caminho reaproveita o mesmo texto
+    copia = tmp_path / "copia.pdf"
+    copia.write_bytes(caminho.read_bytes())
+    assert cache.carregar(str(copia)) == ["a", None, "c"]
+
+
+def test_texto_pdf_invalidado_quando_o_pdf_muda(meg, tmp_path, gerar_pdf):
+    caminho = tmp_path / "doc.pdf"
+    gerar_pdf(caminho, _paginas("antes"))
+    cache = meg.CacheTextoPdf(_pasta(tmp_path))
+    cache.salvar(str(caminho), ["antes"])
+    assert cache.carregar(str(caminho)) == ["antes"]
+    gerar_pdf(caminho, _paginas("depois"))
+    os.utime(caminho, ns=(1_700_000_000_000_000_000,) * 2)
+    assert cache.carregar(str(caminho)) is None
+
+
+def test_extracao_usa_o_cache_na_segunda_leitura(meg, tmp_path, gerar_pdf, monkeypatch):
+    caminho = tmp_path / "doc.pdf"
+    gerar_pdf(caminho, _paginas("extracao"))
+    primeira = meg.extrair_textos_pdf(str(caminho), trabalhadores=1)
+    assert primeira[0].startswith("extracao pagina 1")
+
+    # A segunda leitura não abre o PDF
+    monkeypatch.setattr(meg.pdfplumber, 'open', _nao_abrir)
+    logs = []
+    assert meg.extrair_textos_pdf(str(caminho), log_callback=logs.append) == primeira
+    assert logs == ["Texto do PDF reaproveitado do cache: doc.pdf (3 páginas)"]
+
+
+
+class _Leitor:
+    """Leitor que conta as chamadas e devolve o conteúdo do arquivo"""
+
+    def __init__(self):
+        self.chamadas = 0
+
+    def __call__(self, caminho):
+        self.chamadas += 1
+        with open(caminho, 'rb') as f:
+            return f.read()
+
+
+def test_snapshot_reaproveitado_sem_alteracao(meg, tmp_path):
+    origem = tmp_path / "contatos.xlsx"
+    origem.write_bytes(b"planilha")
+    cache = meg.CacheSnapshots(_pasta(tmp_path))
+    leitor, logs = _Leitor(), []
+    assert cache.carregar(str(origem), leitor, "v1", logs.append) == b"planilha"
+    assert cache.carregar(str(origem), leitor, "v1", logs.append) == b"planilha"
+    assert leitor.chamadas == 1
+    assert logs == ["Snapshot em cache reutilizado: contatos.xlsx"]
+    # Mesmo conteúdo em outro caminho usa o mesmo snapshot; outra variante de leitura, não
+    copia = tmp_path / "copia.xlsx"
+    copia.write_bytes(b"planilha")
+    cache.carregar(str(copia), leitor, "v1")
+    assert leitor.chamadas == 1
+    cache.carregar(str(origem), leitor, "v2")
+    assert leitor.chamadas == 2
+
+
+def test_snapshot_invalidado_quando_a_planilha_muda(meg, tmp_path):
+    origem = tmp_path / "contatos.xlsx"
+    origem.write_bytes(b"planilha")
+    cache = meg.CacheSnapshots(_pasta(tmp_path))
+    leitor = _Leitor()
+    cache.carregar(str(origem), leitor)
+    origem.write_bytes(b"planilha nova")
+    os.utime(origem, ns=(1_700_000_000_000_000_000,) * 2)
+    assert cache.carregar(str(origem), leitor) == b"planilha nova"
+    assert leitor.chamadas == 2
+    # Só a data mudou: o hash do conteúdo é o mesmo e o snapshot continua valendo
+    os.utime(origem, ns=(1_800_000_000_000_000_000,) * 2)
+    assert cache.carregar(str(origem), leitor) == b"planilha nova"
+    assert leitor.chamadas == 2
+
+
+def test_ler_excel_com_snapshot_igual_a_leitura_direta(meg, tmp_path, monkeypatch):
+    monkeypatch.setenv('LOCALAPPDATA', str(tmp_path / "local"))
+    origem = tmp_path / "contatos.xlsx"
+    wb = openpyxl.Workbook()
+    for linha in [["Código", "Empresa"], [10, "EMPRESA DEZ"], [None, "SEM CÓDIGO"], [20.5, "EMPRESA VINTE"]]:
+        wb.active.append(linha)
+    wb.save(origem)
+    direto = meg.ler_excel(str(origem))
+    logs = []
+    pd.testing.assert_frame_equal(meg.ler_excel_com_snapshot(str(origem), logs.append), direto)
+    pd.testing.assert_frame_equal(meg.ler_excel_com_snapshot(str(origem), logs.append), direto)
+    assert logs == ["Snapshot em cache reutilizado: contatos.xlsx"]
+
+
+def test_limpar_cache_pela_linha_de_comando(meg, tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv('LOCALAPPDATA', str(tmp_path))
+    for subpasta, nome in [('snapshots', 'a.pkl'), ('texto_pdf', 'b.json.gz'), ('entradas', 'c.xlsx')]:
+        with open(os.path.join(meg.pasta_cache(subpasta), nome), 'wb') as f:
+            f.write(b"x" * 200 * 1024)
+    monkeypatch.setattr(meg.sys, 'argv', ['M.E.G_ONE.py', '--limpar-cache'])
+    meg.main()
+    assert capsys.readouterr().out.strip() == "Cache limpo: 3 arquivos, 0.6 MB liberados"
+    assert [nomes for _, _, nomes in os.walk(meg.pasta_cache()) if nomes] == []
+    # Segunda vez: nada a remover
+    assert meg.limpar_cache() == (0, 0)
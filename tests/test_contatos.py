@@ -0,0 +1,129 @@
+from datetime import datetime
+
+import openpyxl
+import pandas as pd
+
+
+def _diretorio(meg, tmp_path, linhas):
+    caminho = tmp_path / "contatos.xlsx"
+    wb = openpyxl.Workbook()
+    for linha in [["Código", "Empresa", "Contato", "Grupo"]] + linhas:
+        wb.active.append(linha)
+    wb.save(caminho)
+    return meg.ContactDirectory(str(caminho))
+
+
+def test_contatos_por_codigo(meg, tmp_path):
+    diretorio = _diretorio(meg, tmp_path, [
+        [10, "EMPRESA DEZ", "Ana", "G1"],
+        [None, "SEM CÓDIGO", "Bruno", "G2"],
+        ["10.0", "EMPRESA DEZ NOVA", "Carla", None],
+    ])
+    contatos = diretorio.contatos_por_codigo()
+    # A última linha do código prevalece e contatos sem código ficam de fora (sem chave "")
+    assert contatos == {'10': {'empresa': "EMPRESA DEZ NOVA", 'contato': "Carla", 'grupo': None}}
+
+
+def test_posicoes_por_codigo_e_nome(meg, tmp_path):
+    diretorio = _diretorio(meg, tmp_path, [[10, "Empresa Dez", "Ana", "G1"], [20, " EMPRESA VINTE ", "Bia", "G2"]])
+    assert diretorio.posicoes_por_codigo(pd.Series(['20', '30'])).tolist()[0] == 1
+    assert diretorio.posicoes_por_codigo(pd.Series(['30'])).isna().all()
+    assert diretorio.posicoes_por_nome(pd.Series(['empresa vinte'])).tolist() == [1]
+
+
+def _gravar_xlsx(caminho, linhas):
+    wb = openpyxl.Workbook()
+    for linha in linhas:
+        wb.active.append(linha)
+    wb.save(caminho)
+
+
+def test_contato_com_codigo_vazio_nos_dois_lados(meg, tmp_path):
+    base = tmp_path / "base.xlsx"
+    contatos = tmp_path / "contatos.xlsx"
+    saida = tmp_path / "saida.xlsx"
+    _gravar_xlsx(base, [["Código", "Nome", "CNPJ"], [10, "Empresa Dez", "12345678000199"],
+                        [None, "Sem código", None], [20, "Empresa Vinte", None]])
+    # Um código vazio faz o pandas ler a coluna de códigos dos contatos como float (10.0)
+    _gravar_xlsx(contatos, [["Código", "Empresa", "Contato", "Grupo"], [10, "EMPRESA DEZ", "ana", "G1"],
+                            [None, "SEM CÓDIGO", "zeca", "G9"], [20, "EMPRESA VINTE", "bia", "G2"]])
+    meg.processar_contato(str(base), str(contatos), str(saida), lambda *a: None, lambda *a: None)
+    df = pd.read_excel(saida, dtype=str).fillna('')
+    assert df[['Codigo', 'Contato', 'Grupo']].values.tolist() == [
+        ['10', 'ana', 'G1'], ['20', 'bia', 'G2'], ['', '', '']]
+
+
+def test_contato_com_codigos_repetidos(meg, tmp_path):
+    base = tmp_path / "base.xlsx"
+    contatos = tmp_path / "contatos.xlsx"
+    saida = tmp_path / "saida.xlsx"
+    _gravar_xlsx(base, [["Código", "Nome", "CNPJ"], [10, "Empresa Dez", None], [10, "Empresa Dez (repetida)", None],
+                        [20, "Empresa Vinte", None]])
+    # Código 10 três vezes (uma como "10.0") e 20 duas: vale a primeira ocorrência de cada
+    _gravar_xlsx(contatos, [["Código", "Empresa", "Contato", "Grupo"], [10, "EMPRESA DEZ", "ana", "G1"],
+                            [20, "EMPRESA VINTE", "bia", "G2"], ["10.0", "EMPRESA DEZ", "caio", "G3"],
+                            [10, "EMPRESA DEZ", "duda", "G4"], [20, "EMPRESA VINTE", "edu", "G5"]])
+    logs = []
+    meg.processar_contato(str(base), str(contatos), str(saida), logs.append, lambda *a: None)
+    df = pd.read_excel(saida, dtype=str).fillna('')
+    # Uma linha por código da origem, sem multiplicar pelo número de contatos repetidos
+    assert df[['Codigo', 'Nome', 'Contato', 'Grupo']].values.tolist() == [
+        ['10', 'Empresa Dez', 'ana', 'G1'], ['20', 'Empresa Vinte', 'bia', 'G2']]
+    assert "Códigos repetidos no Excel de Contatos: 3 linhas ignoradas (mantida a primeira ocorrência)" in logs
+
+
+def test_contato_sem_codigos_repetidos_nao_registra_aviso(meg, tmp_path):
+    base = tmp_path / "base.xlsx"
+    contatos = tmp_path / "contatos.xlsx"
+    _gravar_xlsx(base, [["Código", "Nome", "CNPJ"], [10, "Empresa Dez", None]])
+    _gravar_xlsx(contatos, [["Código", "Empresa", "Contato", "Grupo"], [10, "EMPRESA DEZ", "ana", "G1"],
+                            [20, "EMPRESA VINTE", "bia", "G2"]])
+    logs = []
+    meg.processar_contato(str(base), str(contatos), str(tmp_path / "saida.xlsx"), logs.append, lambda *a: None)
+    assert not any("repetidos" in linha for linha in logs)
+
+def test_carregar_contatos_excel_igual_ao_diretorio(meg, tmp_path):
+    linhas = [[10, "EMPRESA DEZ", "Ana", "G1"], [None, "SEM CÓDIGO", "Zeca", "G9"],
+              ["20", "EMPRESA VINTE", None, "G2"], [30.0, "EMPRESA TRINTA", "Carla", None],
+              [10, "EMPRESA DEZ NOVA", "Dora", "G3"]]
+    diretorio = _diretorio(meg, tmp_path, linhas)
+    esperado = diretorio.contatos_por_codigo()
+    for tamanho_bloco in (1, 2, 1000):
+        assert dict(meg.iterar_contatos_excel(diretorio.caminho, tamanho_bloco=tamanho_bloco)) == esperado
+    # Filtro por códigos: os demais nem chegam a virar registro
+    assert meg.carregar_contatos_excel(diretorio.caminho, {'10', '40'}) == {'10': esperado['10']}
+
+
+def test_comunicado_com_e_sem_diretorio(meg, tmp_path, monkeypatch):
+    base = tmp_path / "base.xlsx"
+    _gravar_xlsx(base, [["Código", "Empresa", "CNPJ", "D", "Vencimento", "F", "G", "Situação"],
+                        [10, "Empresa Dez", "12345678000199", None, datetime(2030, 1, 10), None, None, "OK"],
+                        [20, "Empresa Vinte", "98765432000100", None, datetime(2020, 1, 10), None, None, "OK"]])
+    diretorio = _diretorio(meg, tmp_path, [[10, "EMPRESA DEZ", "ana", "G1"], [30, "EMPRESA TRINTA", "zeca", "G3"]])
+    saidas = []
+    for motor, contatos in ((None, None), ('calamine', None), (None, diretorio)):
+        monkeypatch.setattr(meg, 'ENGINE_LEITURA_EXCEL', motor)
+        saida = tmp_path / f"saida_{len(saidas)}.xlsx"
+        meg.processar_comunicado(str(base), diretorio.caminho, str(saida), lambda *a: None, lambda *a: None,
+                                 contatos=contatos)
+        saidas.append(pd.read_excel(saida, dtype=str))
+    pd.testing.assert_frame_equal(saidas[0], saidas[2])
+    pd.testing.assert_frame_equal(saidas[1], saidas[2])
+    assert saidas[2]['Contato Onvio'].fillna('').tolist() == ['ana', '']
+
+
+def test_consultas_por_codigo_nome_e_cnpj(meg, tmp_path):
+    caminho = tmp_path / "contatos_cnpj.xlsx"
+    _gravar_xlsx(caminho, [["Código", "Empresa", "Contato", "Grupo", "CNPJ"],
+                           [10, "Empresa Dez", "Ana", "G1", "12.345.678/0001-99"],
+                           [20, " EMPRESA VINTE ", "Bia", "G2", 1234567000188],
+                           [30, "Empresa Trinta", "Caio", "G3", None]])
+    diretorio = meg.ContactDirectory(str(caminho))
+    assert diretorio.posicao_por_codigo(20.0) == 1
+    assert diretorio.posicao_por_codigo('40') is None
+    assert diretorio.posicao_por_nome("Empresa Vinte") == 1
+    # Índice de CNPJ só é montado na primeira consulta
+    assert diretorio._por_cnpj is None
+    assert diretorio.posicao_por_cnpj("12345678000199") == 0
+    assert diretorio.posicao_por_cnpj("01.234.567/0001-88") == 1
+    assert diretorio.posicao_por_cnpj("") is None
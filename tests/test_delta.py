@@ -0,0 +1,62 @@
+import openpyxl
+
+
+def _gravar_xlsx(caminho, linhas):
+    wb = openpyxl.Workbook()
+    for linha in linhas:
+        wb.active.append(linha)
+    wb.save(caminho)
+
+
+def _sem_log(*args, **kwargs):
+    pass
+
+
+def _delta(meg, caminho, linhas):
+    with meg.abrir_saida_delta(str(caminho), ['Código', 'Nome', 'Valor']) as saida:
+        saida.escrever_linhas(linhas)
+    return saida, meg.ler_arquivo_saida(str(caminho), 'csv')[1]
+
+
+LINHAS = [[10, 'Empresa Dez', 1.5], [20, 'Empresa Vinte', None], [20, 'Empresa Vinte', 3]]
+
+
+def test_entrada_sem_alteracao(meg, tmp_path):
+    saida = tmp_path / "saida.csv"
+    primeira, gravadas = _delta(meg, saida, LINHAS)
+    assert (primeira.novos, primeira.gravadas) == (3, 3)
+    segunda, gravadas = _delta(meg, saida, LINHAS)
+    assert (segunda.novos, segunda.alterados, segunda.removidos, segunda.iguais) == (0, 0, 0, 3)
+    assert gravadas == []
+
+
+def test_linha_alterada_nova_e_removida(meg, tmp_path):
+    saida = tmp_path / "saida.csv"
+    _delta(meg, saida, LINHAS)
+    segunda, gravadas = _delta(meg, saida, [[10, 'Empresa Dez', 2.5], [20, 'Empresa Vinte', None], [30, 'Nova', 1]])
+    assert (segunda.novos, segunda.alterados, segunda.removidos, segunda.iguais) == (1, 1, 1, 1)
+    assert gravadas == [['10', 'Empresa Dez', '2.5', 'alterado'], ['30', 'Nova', '1', 'novo'],
+                        ['20', None, None, 'removido']]
+
+
+def test_codigo_float_e_int_sao_iguais(meg, tmp_path):
+    saida = tmp_path / "saida.csv"
+    _delta(meg, saida, [[999.0, 'Empresa', 2.0]])
+    segunda, gravadas = _delta(meg, saida, [[999, 'Empresa', 2]])
+    assert (segunda.novos, segunda.alterados, segunda.removidos, segunda.iguais) == (0, 0, 0, 1)
+
+
+def test_all_info_em_memoria_e_streaming(meg, tmp_path):
+    """A mesma origem lida em memória (códigos float por causa do vazio) e em streaming não gera delta"""
+    origem = tmp_path / "origem.xlsx"
+    contatos = tmp_path / "contatos.xlsx"
+    _gravar_xlsx(origem, [["Código"], [10], [None], [999], [20]])
+    _gravar_xlsx(contatos, [["Código", "Empresa", "Contato", "Grupo"], [10, "EMPRESA DEZ", "Ana", "G1"],
+                            [20, "EMPRESA VINTE", "Bia", "G2"]])
+    saida = tmp_path / "saida.csv"
+    meg.processar_all_info(str(origem), str(contatos), str(saida), _sem_log, _sem_log, tamanho_bloco=0, delta=True)
+    for tamanho_bloco in (2, 0):
+        logs = []
+        meg.processar_all_info(str(origem), str(contatos), str(saida), logs.append, _sem_log,
+                               tamanho_bloco=tamanho_bloco, delta=True)
+        assert any(log.startswith("Modo delta: 0 novas, 0 alteradas, 0 removidas, 4 sem alteração") for log in logs)
@@ -0,0 +1,94 @@
+"""ler_excel dá o mesmo DataFrame com calamine e com a engine padrão do pandas"""
+from datetime import datetime
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+
+
+def _gravar_xlsx(caminho, linhas):
+    wb = openpyxl.Workbook()
+    for linha in linhas:
+        wb.active.append(linha)
+    wb.save(caminho)
+
+
+def _ler_com_as_duas_engines(meg, monkeypatch, caminho, **kwargs):
+    pytest.importorskip("python_calamine")
+    if meg._VERSAO_PANDAS < (2, 2):
+        pytest.skip("calamine no pandas só a partir da 2.2")
+    leituras = []
+    for engine in ('calamine', None):
+        monkeypatch.setattr(meg, 'ENGINE_LEITURA_EXCEL', engine)
+        leituras.append(meg.ler_excel(str(caminho), **kwargs))
+    return leituras
+
+
+# Códigos inteiros, floats inteiros, texto com zeros à esquerda, decimais, vazios e textos em branco
+# na mesma coluna (o calamine lê texto só com espaços como célula vazia)
+LINHAS = [
+    ["Código", "Empresa", "CNPJ", "Valor", "Vencimento"],
+    [10, "EMPRESA DEZ", "01234567000199", 1.5, datetime(2024, 1, 31)],
+    [20.0, "EMPRESA VINTE", 12345678000199, None, None],
+    [None, "SEM CÓDIGO", None, 3, datetime(2024, 2, 29)],
+    ["0030", "EMPRESA TRINTA", "", 0, None],
+    [40.5, "  ", "98.765.432/0001-10", -2.25, datetime(2024, 3, 1, 12, 30)],
+    [" ", "\t", " 12 ", None, None],
+    ["  ", " ", None, None, None],
+    [50, "EMPRESA CINQUENTA", 98765432000110, 1e10, datetime(2024, 4, 1)],
+]
+
+
+def test_engines_iguais_com_codigos_mistos(meg, tmp_path, monkeypatch):
+    caminho = tmp_path / "mistos.xlsx"
+    _gravar_xlsx(caminho, LINHAS)
+    calamine, padrao = _ler_com_as_duas_engines(meg, monkeypatch, caminho)
+    pd.testing.assert_frame_equal(calamine, padrao)
+
+
+def test_engines_iguais_so_com_inteiros_e_vazios(meg, tmp_path, monkeypatch):
+    # Coluna de inteiros com vazios: as duas engines leem como float (10.0) e limpar_codigo_serie volta a '10'
+    caminho = tmp_path / "inteiros.xlsx"
+    _gravar_xlsx(caminho, [["Código", "Nome"], [10, "A"], [None, "B"], [30, "C"], ["  ", None]])
+    calamine, padrao = _ler_com_as_duas_engines(meg, monkeypatch, caminho)
+    pd.testing.assert_frame_equal(calamine, padrao)
+    assert meg.limpar_codigo_serie(calamine.iloc[:, 0]).tolist() == ['10', '', '30', '']
+
+
+def test_engines_iguais_com_colunas_e_dtype(meg, tmp_path, monkeypatch):
+    caminho = tmp_path / "mistos.xlsx"
+    _gravar_xlsx(caminho, LINHAS)
+    for kwargs in ({'colunas': [0, 2]}, {'colunas': [0, 9]}, {'dtype': str}, {'header': None}):
+        calamine, padrao = _ler_com_as_duas_engines(meg, monkeypatch, caminho, **kwargs)
+        pd.testing.assert_frame_equal(calamine, padrao, obj=str(kwargs))
+
+
+def test_all_igual_nas_duas_engines(meg, tmp_path, monkeypatch):
+    origem = tmp_path / "origem.xlsx"
+    contatos = tmp_path / "contatos.xlsx"
+    _gravar_xlsx(origem, [["Código", "Empresa"], [10, "Empresa Dez"], [20.0, "Empresa Vinte Ltda"],
+                          [None, "Empresa Trinta"], ["0040", "Empresa Quarenta"], [50, "Nao Existe"],
+                          [None, "  "], [60, " "]])
+    _gravar_xlsx(contatos, [["Código", "Empresa", "Contato", "Grupo"], [10, "EMPRESA DEZ", "ana", "G1"],
+                            [20, "EMPRESA VINTE LTDA", "bia", None], [30, "EMPRESA TRINTA", "caio", "G3"],
+                            [40, "EMPRESA QUARENTA", "duda", " "], [None, "SEM CÓDIGO", "edu", "G5"],
+                            [60, "  ", "fabi", "G6"]])
+    saidas = []
+    pytest.importorskip("python_calamine")
+    for engine in ('calamine', None):
+        monkeypatch.setattr(meg, 'ENGINE_LEITURA_EXCEL', engine)
+        saida = tmp_path / f"all_{engine}.xlsx"
+        meg.processar_all(str(origem), str(contatos), str(saida), lambda *a: None, lambda *a: None)
+        saidas.append(pd.read_excel(saida, dtype=object))
+    pd.testing.assert_frame_equal(*saidas)
+
+
+def test_streaming_igual_a_leitura_em_memoria_com_brancos(meg, tmp_path, monkeypatch):
+    caminho = tmp_path / "mistos.xlsx"
+    _gravar_xlsx(caminho, LINHAS)
+    calamine, _ = _ler_com_as_duas_engines(meg, monkeypatch, caminho)
+    blocos = pd.concat(meg.ler_excel_em_blocos(str(caminho), [1, 3], tamanho_bloco=2))
+    esperado = calamine.iloc[:, [1, 3]].astype(object).where(calamine.iloc[:, [1, 3]].notna(), np.nan)
+    assert blocos.isna().values.tolist() == esperado.isna().values.tolist()
+    assert blocos.iloc[:, 0].dropna().tolist() == esperado.iloc[:, 0].dropna().tolist()
@@ -0,0 +1,64 @@
+import math
+import multiprocessing
+
+import pytest
+
+
+def _paginas(total):
+    return [[f"Cliente: {pagina}", f"Nome: Empresa {pagina}", f"linha {pagina}"] for pagina in range(1, total + 1)]
+
+
+@pytest.fixture
+def contar(meg, monkeypatch):
+    """Conta as chamadas de CacheTextoPdf.carregar e de pdfplumber.open feitas pelo módulo"""
+    chamadas = {'carregar': 0, 'abrir': 0}
+    carregar = meg.CacheTextoPdf.carregar
+    abrir = meg.pdfplumber.open
+
+    def carregar_contando(self, caminho_pdf):
+        chamadas['carregar'] += 1
+        return carregar(self, caminho_pdf)
+
+    def abrir_contando(*args, **kwargs):
+        chamadas['abrir'] += 1
+        return abrir(*args, **kwargs)
+
+    monkeypatch.setattr(meg.CacheTextoPdf, 'carregar', carregar_contando)
+    monkeypatch.setattr(meg.pdfplumber, 'open', abrir_contando)
+    return chamadas
+
+
+def test_pdf_pequeno_abre_uma_vez_e_consulta_cache_uma_vez(meg, tmp_path, gerar_pdf, contar):
+    caminho = tmp_path / "pequeno.pdf"
+    gerar_pdf(caminho, _paginas(3))
+    textos = meg.extrair_textos_pdf(str(caminho), trabalhadores=4)
+    assert textos == ["Cliente: 1\nNome: Empresa 1\nlinha 1", "Cliente: 2\nNome: Empresa 2\nlinha 2",
+                      "Cliente: 3\nNome: Empresa 3\nlinha 3"]
+    assert contar == {'carregar': 1, 'abrir': 1}
+    # Segunda leitura: vem do cache, sem abrir o PDF
+    assert meg.extrair_textos_pdf(str(caminho), trabalhadores=4) == textos
+    assert contar == {'carregar': 2, 'abrir': 1}
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                    reason="os processos do pool precisam herdar o módulo carregado de M.E.G_ONE.py")
+@pytest.mark.parametrize("total_paginas, trabalhadores", [(7, 3), (9, 2), (4, 8)])
+def test_extracao_em_processos_igual_a_serial(meg, tmp_path, gerar_pdf, monkeypatch, total_paginas, trabalhadores):
+    caminho = tmp_path / "grande.pdf"
+    gerar_pdf(caminho, _paginas(total_paginas) + [[]])
+    total_paginas += 1  # última página sem texto
+    # Sem cache (cada leitura extrai de novo) e limites baixos para dividir um PDF pequeno em faixas
+    monkeypatch.setattr(meg, '_abrir_cache_texto_pdf', lambda: None)
+    monkeypatch.setattr(meg, 'PAGINAS_MINIMAS_PARALELO', 2)
+    monkeypatch.setattr(meg, 'PAGINAS_POR_TAREFA_PDF', 2)
+
+    serial = list(meg.iterar_textos_pdf(str(caminho)))
+    assert len(serial) == total_paginas
+    assert meg.extrair_textos_pdf(str(caminho), trabalhadores=1) == serial
+
+    logs, progresso = [], []
+    em_processos = meg.extrair_textos_pdf(str(caminho), progresso.append, logs.append, trabalhadores=trabalhadores)
+    assert em_processos == serial
+    faixas = math.ceil(total_paginas / max(2, math.ceil(total_paginas / (trabalhadores * 2))))
+    assert logs == [f"Lendo {total_paginas} páginas em {min(trabalhadores, faixas)} processos"]
+    assert progresso[-1] == 1.0 and progresso == sorted(progresso)
@@ -0,0 +1,120 @@
+import os
+
+import pytest
+
+
+def _ler(meg, caminho, formato='csv'):
+    return meg.ler_arquivo_saida(str(caminho), formato)[1]
+
+
+def _gravar(meg, caminho, linhas, limite_linhas=2, **kwargs):
+    return meg.salvar_linhas(linhas, ['Código', 'Nome'], str(caminho), limite_linhas=limite_linhas, **kwargs)
+
+
+def test_divisao_em_arquivos(meg, tmp_path):
+    saida = tmp_path / "saida.csv"
+    _gravar(meg, saida, [[i, f"Nome {i}"] for i in range(5)])
+    assert sorted(os.listdir(tmp_path)) == ["saida.csv", "saida_2.csv", "saida_3.csv"]
+    assert _ler(meg, saida) == [['0', 'Nome 0'], ['1', 'Nome 1']]
+    assert _ler(meg, tmp_path / "saida_3.csv") == [['4', 'Nome 4']]
+
+
+def test_partes_antigas_removidas(meg, tmp_path):
+    saida = tmp_path / "saida.csv"
+    _gravar(meg, saida, [[i, f"Nome {i}"] for i in range(7)])
+    assert len(os.listdir(tmp_path)) == 4
+    # Nova execução menor: saida_3 e saida_4 da execução anterior não podem ficar para trás
+    _gravar(meg, saida, [[i, f"Novo {i}"] for i in range(3)])
+    assert sorted(os.listdir(tmp_path)) == ["saida.csv", "saida_2.csv"]
+    assert _ler(meg, tmp_path / "saida_2.csv") == [['2', 'Novo 2']]
+
+
+def test_partes_publicadas_juntas_no_fechamento(meg, tmp_path):
+    saida = tmp_path / "saida.csv"
+    with meg.abrir_saida(str(saida), ['Código', 'Nome'], limite_linhas=2) as escrita:
+        escrita.escrever_linhas([i, f"Nome {i}"] for i in range(5))
+        # Partes cheias ficam no temporário local até o fechamento
+        assert os.listdir(tmp_path) == []
+    assert sorted(os.listdir(tmp_path)) == ["saida.csv", "saida_2.csv", "saida_3.csv"]
+
+
+def test_erro_descarta_todas_as_partes(meg, tmp_path):
+    saida = tmp_path / "saida.csv"
+    _gravar(meg, saida, [[i, f"Antigo {i}"] for i in range(3)])
+    temporarios = meg.pasta_cache('temporarios')
+    with pytest.raises(RuntimeError):
+        with meg.abrir_saida(str(saida), ['Código', 'Nome'], limite_linhas=2) as escrita:
+            escrita.escrever_linhas([i, f"Novo {i}"] for i in range(5))
+            raise RuntimeError("falha no processamento")
+    # Destino intacto, sem temporários nem .parcial sobrando
+    assert sorted(os.listdir(tmp_path)) == ["saida.csv", "saida_2.csv"]
+    assert _ler(meg, saida) == [['0', 'Antigo 0'], ['1', 'Antigo 1']]
+    assert _ler(meg, tmp_path / "saida_2.csv") == [['2', 'Antigo 2']]
+    assert os.listdir(temporarios) == []
+
+
+def test_upsert_chave_com_codigo_limpo(meg, tmp_path):
+    saida = tmp_path / "saida.xlsx"
+    meg.salvar_linhas([[4, "Antigo 4"], [5, "Antigo 5"]], ['Código', 'Nome'], str(saida))
+    # Código lido como número no arquivo e recebido como texto '4.0' na nova execução
+    meg.salvar_linhas([['4.0', "Novo 4"], ['6', "Novo 6"]], ['Código', 'Nome'], str(saida), upsert=True)
+    assert _ler(meg, saida, 'xlsx') == [['4.0', 'Novo 4'], [5, 'Antigo 5'], ['6', 'Novo 6']]
+
+
+def test_upsert_chave_composta_com_vazio(meg, tmp_path):
+    saida = tmp_path / "saida.xlsx"
+    colunas = ['Nº', 'EMPRESAS', 'Cod.Funcionário', 'Funcionário']
+    chaves = ['Nº', 'EMPRESAS', 'Cod.Funcionário']
+    meg.salvar_linhas([['', 'EMPRESA A', 1, 'Ana'], ['', 'EMPRESA B', 1, 'Bia']], colunas, str(saida), upsert=chaves)
+    # Empresas diferentes sem Nº não se sobrescrevem
+    meg.salvar_linhas([['', 'EMPRESA B', 1, 'Bia Souza']], colunas, str(saida), upsert=chaves)
+    assert _ler(meg, saida, 'xlsx') == [[None, 'EMPRESA A', 1, 'Ana'], [None, 'EMPRESA B', 1, 'Bia Souza']]
+
+
+@pytest.mark.parametrize("extensao", ["csv", "jsonl"])
+def test_upsert_so_chaves_novas_anexa_no_fim(meg, tmp_path, extensao):
+    saida = tmp_path / f"saida.{extensao}"
+    meg.salvar_linhas([[1, "Um"], [2, "Dois"]], ['Código', 'Nome'], str(saida))
+    conteudo_antes = saida.read_bytes()
+    logs = []
+    meg.salvar_linhas([[3, "Três"]], ['Código', 'Nome'], str(saida), upsert=True, log_callback=logs.append)
+    # O conteúdo anterior fica intacto, byte a byte, e a linha nova vai para o fim
+    assert saida.read_bytes().startswith(conteudo_antes)
+    assert [linha[1] for linha in _ler(meg, saida, extensao)] == ["Um", "Dois", "Três"]
+    assert any("anexadas no fim" in log for log in logs)
+
+
+def test_upsert_chave_existente_regrava(meg, tmp_path):
+    saida = tmp_path / "saida.csv"
+    meg.salvar_linhas([[1, "Um"], [2, "Dois"]], ['Código', 'Nome'], str(saida))
+    logs = []
+    meg.salvar_linhas([[3, "Três"], [1, "Um novo"]], ['Código', 'Nome'], str(saida), upsert=True,
+                      log_callback=logs.append)
+    assert _ler(meg, saida) == [['1', 'Um novo'], ['2', 'Dois'], ['3', 'Três']]
+    assert any("arquivo regravado" in log for log in logs)
+
+
+def test_upsert_falha_ao_anexar_restaura_arquivo(meg, tmp_path, monkeypatch):
+    saida = tmp_path / "saida.csv"
+    meg.salvar_linhas([[1, "Um"]], ['Código', 'Nome'], str(saida))
+    conteudo_antes = saida.read_bytes()
+    gravar = meg.SaidaCsv._gravar
+
+    def gravar_e_falhar(self, valores):
+        gravar(self, valores)
+        self._arquivo.flush()
+        raise OSError("disco cheio")
+
+    monkeypatch.setattr(meg.SaidaCsv, '_gravar', gravar_e_falhar)
+    with pytest.raises(OSError):
+        meg.salvar_linhas([[2, "Dois"], [3, "Três"]], ['Código', 'Nome'], str(saida), upsert=True)
+    assert saida.read_bytes() == conteudo_antes
+
+
+def test_upsert_em_partes_regrava_todas(meg, tmp_path):
+    saida = tmp_path / "saida.csv"
+    _gravar(meg, saida, [[i, f"Nome {i}"] for i in range(5)])
+    _gravar(meg, saida, [[1, "Novo 1"], [9, "Nome 9"]], upsert=True)
+    linhas = [linha for nome in ("saida.csv", "saida_2.csv", "saida_3.csv") for linha in _ler(meg, tmp_path / nome)]
+    assert linhas == [['0', 'Nome 0'], ['1', 'Novo 1'], ['2', 'Nome 2'], ['3', 'Nome 3'], ['4', 'Nome 4'],
+                      ['9', 'Nome 9']]
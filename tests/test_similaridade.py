@@ -0,0 +1,91 @@
+"""A busca podada e o IndiceSimilaridade dão o mesmo resultado da varredura linear com ratio()"""
+import random
+
+import pytest
+
+PALAVRAS = ["comercio", "servicos", "ltda", "me", "eireli", "transportes", "construtora", "alimentos",
+            "auto", "pecas", "silva", "santos", "oliveira", "souza", "industria", "distribuidora", "&", "s/a"]
+
+
+def _nome_aleatorio(gerador):
+    return " ".join(gerador.choice(PALAVRAS) for _ in range(gerador.randint(1, 5)))
+
+
+def _variacao(gerador, nome):
+    """Nome com pequenos erros de digitação, como nos PDFs e planilhas"""
+    letras = list(nome)
+    for _ in range(gerador.randint(0, 3)):
+        posicao = gerador.randrange(len(letras))
+        operacao = gerador.choice(("trocar", "remover", "inserir"))
+        if operacao == "trocar":
+            letras[posicao] = gerador.choice("abcdefghijklmnopqrstuvwxyz ")
+        elif operacao == "remover" and len(letras) > 1:
+            del letras[posicao]
+        else:
+            letras.insert(posicao, gerador.choice("abcdefghijklmnopqrstuvwxyz"))
+    return "".join(letras)
+
+
+def _varredura_linear(meg, nome_busca, contatos_por_nome, limite):
+    """Busca original: ratio() completo contra todos os nomes"""
+    if not nome_busca:
+        return None, 0.0
+    melhor_match, melhor_similaridade = None, 0.0
+    for nome_contato, contato_info in contatos_por_nome.items():
+        similaridade = meg.calcular_similaridade(nome_busca, nome_contato)
+        if similaridade >= limite and similaridade > melhor_similaridade:
+            melhor_similaridade, melhor_match = similaridade, contato_info
+    return melhor_match, melhor_similaridade
+
+
+@pytest.fixture(scope="module")
+def cenario():
+    gerador = random.Random(20240601)
+    contatos_por_nome = {}
+    while len(contatos_por_nome) < 250:
+        contatos_por_nome.setdefault(_nome_aleatorio(gerador), len(contatos_por_nome))
+    nomes = list(contatos_por_nome)
+    buscas = [_variacao(gerador, gerador.choice(nomes)) for _ in range(80)]
+    buscas += [_nome_aleatorio(gerador) for _ in range(30)] + [""]
+    return contatos_por_nome, buscas
+
+
+def test_similaridade_podada(meg, cenario):
+    contatos_por_nome, buscas = cenario
+    gerador = random.Random(7)
+    nomes = list(contatos_por_nome)
+    for nome_busca in buscas:
+        for nome_contato in gerador.sample(nomes, 20) + [""]:
+            minimo = gerador.choice((0.0, 0.5, 0.8, 0.95))
+            superar = gerador.choice((None, 0.0, 0.85))
+            ratio = meg.calcular_similaridade(nome_busca, nome_contato)
+            podada = meg.calcular_similaridade_podada(nome_busca, nome_contato, minimo, superar)
+            # Só descarta pares que não atingem o mínimo ou não superam o melhor atual
+            if podada is None:
+                assert ratio < minimo or (superar is not None and ratio <= superar)
+            else:
+                assert podada == ratio
+
+
+@pytest.mark.parametrize("limite", [0.0, 0.6, 0.8, 0.9, 1.0])
+def test_busca_igual_a_varredura_linear(meg, cenario, limite):
+    contatos_por_nome, buscas = cenario
+    contadores = meg.novos_contadores_similaridade()
+    contadores_indice = meg.novos_contadores_similaridade()
+    indice = meg.IndiceSimilaridade(contatos_por_nome, limite)
+    for nome_busca in buscas:
+        esperado = _varredura_linear(meg, nome_busca, contatos_por_nome, limite)
+        assert meg.buscar_por_similaridade(nome_busca, contatos_por_nome, limite, contadores) == esperado
+        assert indice.buscar(nome_busca, contadores_indice) == esperado
+
+    # ratio() completos que a varredura linear faria e a poda/o índice evitaram
+    comparacoes = sum(len(contatos_por_nome) for nome in buscas if nome)
+    evitados = contadores['podadas_tamanho'] + contadores['podadas_caracteres']
+    # A busca podada passa por todos os pares: cada um é podado ou calculado
+    assert evitados + contadores['ratio_completo'] == comparacoes
+    # O índice nem chega a olhar os nomes fora da faixa de tamanho e não calcula mais ratio() que a busca
+    evitados_indice = contadores_indice['podadas_tamanho'] + contadores_indice['podadas_caracteres']
+    assert evitados_indice + contadores_indice['ratio_completo'] <= comparacoes
+    assert contadores_indice['ratio_completo'] <= contadores['ratio_completo']
+    # Mesmo sem limite a poda evita a maior parte; com limite >= 0.8 sobra menos de 5%
+    assert contadores['ratio_completo'] <= comparacoes * (0.05 if limite >= 0.8 else 0.5)
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def staging(meg, tmp_path, monkeypatch):
+    """arquivo_local copiando sempre, com a pasta de cache isolada em tmp_path"""
+    monkeypatch.setattr(meg, 'STAGING_ENTRADAS', 'sempre')
+    monkeypatch.setenv('LOCALAPPDATA', str(tmp_path / "cache"))
+    return os.path.join(tmp_path, "cache", "MEG_ONE", "entradas")
+
+
+def _gravar(caminho, conteudo, mtime_ns=None):
+    with open(caminho, 'wb') as f:
+        f.write(conteudo)
+    if mtime_ns is not None:
+        os.utime(caminho, ns=(mtime_ns, mtime_ns))
+
+
+def test_copia_local_na_pasta_de_entradas(meg, tmp_path, staging):
+    origem = tmp_path / "origem.xlsx"
+    _gravar(origem, b"conteudo original")
+    local = meg.arquivo_local(str(origem))
+    assert os.path.dirname(local) == staging
+    assert local.endswith(".xlsx") and local != str(origem)
+    with open(local, 'rb') as f:
+        assert f.read() == b"conteudo original"
+    assert os.listdir(staging) == [os.path.basename(local)]
+
+
+def test_copia_reaproveitada_sem_alteracao(meg, tmp_path, staging, monkeypatch):
+    origem = tmp_path / "origem.xlsx"
+    _gravar(origem, b"conteudo original", mtime_ns=1_600_000_000_000_000_000)
+    local = meg.arquivo_local(str(origem))
+    copias = []
+    monkeypatch.setattr(meg.shutil, 'copyfile', lambda *args: copias.append(args))
+    assert meg.arquivo_local(str(origem)) == local
+    assert copias == []
+
+
+@pytest.mark.parametrize("conteudo, mtime_ns", [
+    (b"conteudo original", 1_700_000_000_000_000_000),  # só a data mudou
+    (b"conteudo alterado e maior", 1_600_000_000_000_000_000),  # só o tamanho mudou
+])
+def test_nova_copia_apos_alteracao(meg, tmp_path, staging, conteudo, mtime_ns):
+    origem = tmp_path / "origem.xlsx"
+    _gravar(origem, b"conteudo original", mtime_ns=1_600_000_000_000_000_000)
+    antiga = meg.arquivo_local(str(origem))
+
+    _gravar(origem, conteudo, mtime_ns=mtime_ns)
+    nova = meg.arquivo_local(str(origem))
+    assert nova != antiga
+    with open(nova, 'rb') as f:
+        assert f.read() == conteudo
+    # A versão anterior do mesmo arquivo sai do cache
+    assert os.listdir(staging) == [os.path.basename(nova)]
+
+
+def test_sem_copia_fora_da_rede(meg, tmp_path, staging, monkeypatch):
+    monkeypatch.setattr(meg, 'STAGING_ENTRADAS', 'rede')
+    origem = tmp_path / "origem.xlsx"
+    _gravar(origem, b"conteudo original")
+    assert meg.arquivo_local(str(origem)) == str(origem)
+    assert not os.path.exists(staging) or os.listdir(staging) == []